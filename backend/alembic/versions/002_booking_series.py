@@ -0,0 +1,52 @@
+"""booking series
+
+Revision ID: 002
+Revises: 001
+Create Date: 2024-02-01 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "002"
+down_revision: Union[str, None] = "001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "booking_series",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("equipment_id", sa.Integer(), nullable=False),
+        sa.Column("quantity", sa.Integer(), nullable=False, server_default="1"),
+        sa.Column("frequency", sa.String(), nullable=False),
+        sa.Column("interval", sa.Integer(), nullable=False, server_default="1"),
+        sa.Column("until", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("purpose", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.ForeignKeyConstraint(["equipment_id"], ["equipment.id"]),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_booking_series_id"), "booking_series", ["id"], unique=False)
+
+    op.add_column("bookings", sa.Column("series_id", sa.Integer(), nullable=True))
+    op.create_foreign_key(
+        "bookings_series_id_fkey", "bookings", "booking_series", ["series_id"], ["id"]
+    )
+    op.create_index(op.f("ix_bookings_series_id"), "bookings", ["series_id"], unique=False)
+    op.create_index(
+        "ix_bookings_equipment_id_start_time", "bookings", ["equipment_id", "start_time"], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_bookings_equipment_id_start_time", table_name="bookings")
+    op.drop_index(op.f("ix_bookings_series_id"), table_name="bookings")
+    op.drop_constraint("bookings_series_id_fkey", "bookings", type_="foreignkey")
+    op.drop_column("bookings", "series_id")
+    op.drop_index(op.f("ix_booking_series_id"), table_name="booking_series")
+    op.drop_table("booking_series")
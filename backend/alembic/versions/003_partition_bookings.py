@@ -0,0 +1,129 @@
+"""partition bookings by month and add bookings_archive
+
+Revision ID: 003
+Revises: 002
+Create Date: 2024-03-01 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+
+revision: str = "003"
+down_revision: Union[str, None] = "002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = (
+    "id, user_id, equipment_id, quantity, start_time, end_time, purpose, status, "
+    "admin_notes, series_id, created_at, updated_at"
+)
+
+
+def upgrade() -> None:
+    # Partition bounds are month starts in UTC, matching app.core.partitions
+    op.execute("SET TIME ZONE 'UTC'")
+
+    op.drop_index("ix_bookings_equipment_id_start_time", table_name="bookings")
+    op.drop_index("ix_bookings_series_id", table_name="bookings")
+    op.drop_index("ix_bookings_id", table_name="bookings")
+    op.execute("ALTER TABLE bookings RENAME TO bookings_unpartitioned")
+    op.execute("ALTER TABLE bookings_unpartitioned RENAME CONSTRAINT bookings_pkey TO bookings_unpartitioned_pkey")
+    op.execute("ALTER SEQUENCE bookings_id_seq OWNED BY NONE")
+
+    # The partition key has to be part of the primary key
+    op.execute(
+        """
+        CREATE TABLE bookings (
+            id INTEGER NOT NULL DEFAULT nextval('bookings_id_seq'),
+            user_id INTEGER NOT NULL REFERENCES users (id),
+            equipment_id INTEGER NOT NULL REFERENCES equipment (id),
+            quantity INTEGER NOT NULL DEFAULT 1,
+            start_time TIMESTAMP WITH TIME ZONE NOT NULL,
+            end_time TIMESTAMP WITH TIME ZONE NOT NULL,
+            purpose TEXT,
+            status VARCHAR NOT NULL DEFAULT 'pending',
+            admin_notes TEXT,
+            series_id INTEGER REFERENCES booking_series (id),
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            PRIMARY KEY (id, start_time)
+        ) PARTITION BY RANGE (start_time)
+        """
+    )
+    op.execute("ALTER SEQUENCE bookings_id_seq OWNED BY bookings.id")
+    op.create_index("ix_bookings_id", "bookings", ["id"], unique=False)
+    op.create_index("ix_bookings_series_id", "bookings", ["series_id"], unique=False)
+    op.create_index(
+        "ix_bookings_equipment_id_start_time", "bookings", ["equipment_id", "start_time"], unique=False
+    )
+
+    op.execute("CREATE TABLE bookings_default PARTITION OF bookings DEFAULT")
+    op.execute(
+        """
+        DO $$
+        DECLARE
+            month_start TIMESTAMP WITH TIME ZONE;
+        BEGIN
+            FOR month_start IN
+                SELECT generate_series(
+                    date_trunc('month', coalesce((SELECT min(start_time) FROM bookings_unpartitioned), now())),
+                    date_trunc('month', now()) + interval '12 months',
+                    interval '1 month'
+                )
+            LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF bookings FOR VALUES FROM (%L) TO (%L)',
+                    'bookings_' || to_char(month_start, 'YYYY_MM'),
+                    month_start,
+                    month_start + interval '1 month'
+                );
+            END LOOP;
+        END $$
+        """
+    )
+    op.execute(f"INSERT INTO bookings ({COLUMNS}) SELECT {COLUMNS} FROM bookings_unpartitioned")
+    op.execute("DROP TABLE bookings_unpartitioned")
+
+    op.execute("CREATE TABLE bookings_archive (LIKE bookings INCLUDING DEFAULTS)")
+    op.execute("ALTER TABLE bookings_archive ADD PRIMARY KEY (id)")
+    op.create_index("ix_bookings_archive_created_at", "bookings_archive", ["created_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_bookings_archive_created_at", table_name="bookings_archive")
+    op.execute("ALTER TABLE bookings RENAME TO bookings_partitioned")
+    op.execute("ALTER SEQUENCE bookings_id_seq OWNED BY NONE")
+    op.drop_index("ix_bookings_equipment_id_start_time", table_name="bookings_partitioned")
+    op.drop_index("ix_bookings_series_id", table_name="bookings_partitioned")
+    op.drop_index("ix_bookings_id", table_name="bookings_partitioned")
+    op.execute("ALTER TABLE bookings_partitioned RENAME CONSTRAINT bookings_pkey TO bookings_partitioned_pkey")
+    op.execute(
+        """
+        CREATE TABLE bookings (
+            id INTEGER NOT NULL DEFAULT nextval('bookings_id_seq'),
+            user_id INTEGER NOT NULL REFERENCES users (id),
+            equipment_id INTEGER NOT NULL REFERENCES equipment (id),
+            quantity INTEGER NOT NULL DEFAULT 1,
+            start_time TIMESTAMP WITH TIME ZONE NOT NULL,
+            end_time TIMESTAMP WITH TIME ZONE NOT NULL,
+            purpose TEXT,
+            status VARCHAR NOT NULL DEFAULT 'pending',
+            admin_notes TEXT,
+            series_id INTEGER,
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            CONSTRAINT bookings_pkey PRIMARY KEY (id),
+            CONSTRAINT bookings_series_id_fkey FOREIGN KEY (series_id) REFERENCES booking_series (id)
+        )
+        """
+    )
+    op.execute("ALTER SEQUENCE bookings_id_seq OWNED BY bookings.id")
+    op.execute(f"INSERT INTO bookings ({COLUMNS}) SELECT {COLUMNS} FROM bookings_partitioned")
+    op.execute(f"INSERT INTO bookings ({COLUMNS}) SELECT {COLUMNS} FROM bookings_archive")
+    op.execute("DROP TABLE bookings_partitioned")
+    op.execute("DROP TABLE bookings_archive")
+    op.create_index("ix_bookings_id", "bookings", ["id"], unique=False)
+    op.create_index("ix_bookings_series_id", "bookings", ["series_id"], unique=False)
+    op.create_index(
+        "ix_bookings_equipment_id_start_time", "bookings", ["equipment_id", "start_time"], unique=False
+    )
@@ -0,0 +1,24 @@
+"""index booking start and end times
+
+Revision ID: 004
+Revises: 003
+Create Date: 2024-03-15 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+
+revision: str = "004"
+down_revision: Union[str, None] = "003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(op.f("ix_bookings_start_time"), "bookings", ["start_time"], unique=False)
+    op.create_index(op.f("ix_bookings_end_time"), "bookings", ["end_time"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_bookings_end_time"), table_name="bookings")
+    op.drop_index(op.f("ix_bookings_start_time"), table_name="bookings")
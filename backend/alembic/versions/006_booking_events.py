@@ -0,0 +1,42 @@
+"""booking status event log
+
+Revision ID: 006
+Revises: 005
+Create Date: 2024-04-15 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "006"
+down_revision: Union[str, None] = "005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "booking_events",
+        sa.Column("id", sa.BigInteger(), nullable=False),
+        sa.Column("booking_id", sa.Integer(), nullable=False),
+        sa.Column("equipment_id", sa.Integer(), nullable=False),
+        sa.Column("from_status", sa.String(), nullable=True),
+        sa.Column("to_status", sa.String(), nullable=False),
+        sa.Column("actor_id", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["actor_id"], ["users.id"], ondelete="SET NULL"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_booking_events_booking_id_created_at", "booking_events", ["booking_id", "created_at"], unique=False
+    )
+    op.create_index(
+        "ix_booking_events_to_status_created_at", "booking_events", ["to_status", "created_at"], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_booking_events_to_status_created_at", table_name="booking_events")
+    op.drop_index("ix_booking_events_booking_id_created_at", table_name="booking_events")
+    op.drop_table("booking_events")
@@ -0,0 +1,24 @@
+"""index bookings for calendar feed freshness checks
+
+Revision ID: 007
+Revises: 006
+Create Date: 2024-05-01 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+
+revision: str = "007"
+down_revision: Union[str, None] = "006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_bookings_user_id_updated_at", "bookings", ["user_id", "updated_at"], unique=False)
+    op.create_index("ix_bookings_equipment_id_updated_at", "bookings", ["equipment_id", "updated_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_bookings_equipment_id_updated_at", table_name="bookings")
+    op.drop_index("ix_bookings_user_id_updated_at", table_name="bookings")
@@ -0,0 +1,51 @@
+"""booking waitlist
+
+Revision ID: 008
+Revises: 007
+Create Date: 2024-05-15 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "008"
+down_revision: Union[str, None] = "007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "waitlist_entries",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("equipment_id", sa.Integer(), nullable=False),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+        sa.Column("start_time", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("end_time", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("purpose", sa.Text(), nullable=True),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("booking_id", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.ForeignKeyConstraint(["equipment_id"], ["equipment.id"]),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_waitlist_entries_id"), "waitlist_entries", ["id"], unique=False)
+    op.create_index("ix_waitlist_entries_user_id", "waitlist_entries", ["user_id"], unique=False)
+    op.create_index(
+        "ix_waitlist_entries_waiting",
+        "waitlist_entries",
+        ["equipment_id", "end_time", "start_time"],
+        unique=False,
+        postgresql_where=sa.text("status = 'waiting'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_waitlist_entries_waiting", table_name="waitlist_entries")
+    op.drop_index("ix_waitlist_entries_user_id", table_name="waitlist_entries")
+    op.drop_index(op.f("ix_waitlist_entries_id"), table_name="waitlist_entries")
+    op.drop_table("waitlist_entries")
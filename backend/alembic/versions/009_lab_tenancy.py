@@ -0,0 +1,100 @@
+"""multi-lab tenancy
+
+Revision ID: 009
+Revises: 008
+Create Date: 2024-06-01 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "009"
+down_revision: Union[str, None] = "008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Existing rows all belong to the lab this deployment served so far
+DEFAULT_LAB_ID = 1
+LAB_TABLES = ("users", "equipment", "bookings", "booking_series", "waitlist_entries")
+
+
+def upgrade() -> None:
+    op.create_table(
+        "labs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("slug", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_labs_id"), "labs", ["id"], unique=False)
+    op.create_index(op.f("ix_labs_slug"), "labs", ["slug"], unique=True)
+    op.execute(f"INSERT INTO labs (id, name, slug) VALUES ({DEFAULT_LAB_ID}, 'Default Lab', 'default')")
+    op.execute("SELECT setval(pg_get_serial_sequence('labs', 'id'), (SELECT max(id) FROM labs))")
+
+    for table in LAB_TABLES:
+        op.add_column(
+            table, sa.Column("lab_id", sa.Integer(), server_default=str(DEFAULT_LAB_ID), nullable=False)
+        )
+        op.alter_column(table, "lab_id", server_default=None)
+        op.create_foreign_key(f"{table}_lab_id_fkey", table, "labs", ["lab_id"], ["id"])
+    for table in ("bookings_archive", "booking_events"):
+        op.add_column(
+            table, sa.Column("lab_id", sa.Integer(), server_default=str(DEFAULT_LAB_ID), nullable=False)
+        )
+        op.alter_column(table, "lab_id", server_default=None)
+
+    # The lab has to be part of the primary key for bookings to be list-partitioned by it
+    op.execute("ALTER TABLE bookings DROP CONSTRAINT bookings_pkey")
+    op.execute("ALTER TABLE bookings ADD CONSTRAINT bookings_pkey PRIMARY KEY (id, start_time, lab_id)")
+
+    op.create_index("ix_users_lab_id_created_at", "users", ["lab_id", "created_at"], unique=False)
+    op.create_index("ix_equipment_lab_id_name", "equipment", ["lab_id", "name"], unique=False)
+    op.create_index("ix_equipment_lab_id_category", "equipment", ["lab_id", "category"], unique=False)
+    op.create_index("ix_bookings_lab_id_start_time", "bookings", ["lab_id", "start_time"], unique=False)
+    op.create_index("ix_bookings_lab_id_created_at", "bookings", ["lab_id", "created_at"], unique=False)
+    op.create_index("ix_bookings_lab_id_status", "bookings", ["lab_id", "status"], unique=False)
+    op.create_index(
+        "ix_bookings_archive_lab_id_start_time", "bookings_archive", ["lab_id", "start_time"], unique=False
+    )
+    op.drop_index("ix_booking_events_to_status_created_at", table_name="booking_events")
+    op.create_index(
+        "ix_booking_events_lab_id_to_status_created_at",
+        "booking_events",
+        ["lab_id", "to_status", "created_at"],
+        unique=False,
+    )
+    op.drop_index("ix_waitlist_entries_user_id", table_name="waitlist_entries")
+    op.create_index(
+        "ix_waitlist_entries_lab_id_user_id", "waitlist_entries", ["lab_id", "user_id"], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_waitlist_entries_lab_id_user_id", table_name="waitlist_entries")
+    op.create_index("ix_waitlist_entries_user_id", "waitlist_entries", ["user_id"], unique=False)
+    op.drop_index("ix_booking_events_lab_id_to_status_created_at", table_name="booking_events")
+    op.create_index(
+        "ix_booking_events_to_status_created_at", "booking_events", ["to_status", "created_at"], unique=False
+    )
+    op.drop_index("ix_bookings_archive_lab_id_start_time", table_name="bookings_archive")
+    op.drop_index("ix_bookings_lab_id_status", table_name="bookings")
+    op.drop_index("ix_bookings_lab_id_created_at", table_name="bookings")
+    op.drop_index("ix_bookings_lab_id_start_time", table_name="bookings")
+    op.drop_index("ix_equipment_lab_id_category", table_name="equipment")
+    op.drop_index("ix_equipment_lab_id_name", table_name="equipment")
+    op.drop_index("ix_users_lab_id_created_at", table_name="users")
+
+    # Lab sub-partitions (BOOKING_PARTITION_BY_LAB) must be merged back by hand first
+    op.execute("ALTER TABLE bookings DROP CONSTRAINT bookings_pkey")
+    op.execute("ALTER TABLE bookings ADD CONSTRAINT bookings_pkey PRIMARY KEY (id, start_time)")
+
+    for table in ("booking_events", "bookings_archive"):
+        op.drop_column(table, "lab_id")
+    for table in reversed(LAB_TABLES):
+        op.drop_constraint(f"{table}_lab_id_fkey", table, type_="foreignkey")
+        op.drop_column(table, "lab_id")
+    op.drop_index(op.f("ix_labs_slug"), table_name="labs")
+    op.drop_index(op.f("ix_labs_id"), table_name="labs")
+    op.drop_table("labs")
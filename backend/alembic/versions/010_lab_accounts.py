@@ -0,0 +1,32 @@
+"""email to lab directory
+
+Revision ID: 010
+Revises: 009
+Create Date: 2024-06-08 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "010"
+down_revision: Union[str, None] = "009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "lab_accounts",
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("lab_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["lab_id"], ["labs.id"]),
+        sa.PrimaryKeyConstraint("email"),
+    )
+    # Only meaningful in the primary database; users of labs already routed to
+    # their own database must be added there by hand
+    op.execute("INSERT INTO lab_accounts (email, lab_id) SELECT email, lab_id FROM users")
+
+
+def downgrade() -> None:
+    op.drop_table("lab_accounts")
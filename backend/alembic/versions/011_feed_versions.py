@@ -0,0 +1,27 @@
+"""feed versions for deletions and token revocation
+
+Revision ID: 011
+Revises: 010
+Create Date: 2024-06-15 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "011"
+down_revision: Union[str, None] = "010"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    for table, column in (("users", "feed_version"), ("users", "feed_token_version"), ("equipment", "feed_version")):
+        op.add_column(table, sa.Column(column, sa.Integer(), server_default="0", nullable=False))
+        op.alter_column(table, column, server_default=None)
+
+
+def downgrade() -> None:
+    op.drop_column("equipment", "feed_version")
+    op.drop_column("users", "feed_token_version")
+    op.drop_column("users", "feed_version")
@@ -0,0 +1,260 @@
+"""Generate a deterministic synthetic dataset for scale testing.
+
+    python -m app.commands.generate_data --users 5000 --equipment 800 --bookings 10000000
+    python -m app.commands.generate_data --database-url sqlite:///lab.db --create-schema
+    python -m app.commands.generate_data --lab-id 2 --users 500 --bookings 1000000
+
+Rows are appended after the current max ids, so the command can be run against a
+migrated database that already has data. Equipment and user popularity are Zipf-like,
+bookings cluster in working hours and overlap freely, and statuses depend on whether
+a booking is in the past or the future. The same --seed and --anchor produce the
+same rows. Postgres is loaded with COPY; other databases use multi-row inserts.
+"""
+import argparse
+import csv
+import io
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+from sqlalchemy import create_engine, func, insert, select, text
+from sqlalchemy.engine import Connection
+from app.config import settings
+from app.core.partitions import create_booking_partitions
+from app.core.security import get_password_hash
+from app.models import Base, Booking, Equipment, Lab, LabAccount, User
+from app.models.booking import bookings_archive
+
+FIRST_NAMES = ["Ada", "Alan", "Barbara", "Carl", "Dorothy", "Emmy", "Enrico", "Grace", "Henrietta", "Isaac",
+               "Jane", "Katherine", "Linus", "Lise", "Marie", "Niels", "Olga", "Paul", "Rosalind", "Subrahmanyan"]
+LAST_NAMES = ["Lovelace", "Turing", "McClintock", "Sagan", "Hodgkin", "Noether", "Fermi", "Hopper", "Leavitt",
+              "Newton", "Goodall", "Johnson", "Pauling", "Meitner", "Curie", "Bohr", "Ladyzhenskaya", "Dirac",
+              "Franklin", "Chandrasekhar"]
+CATEGORIES = [("Microscopy", 8), ("Spectroscopy", 6), ("Centrifuges", 5), ("PCR", 4), ("Chromatography", 4),
+              ("Glassware", 3), ("Incubators", 3), ("Imaging", 2), ("Computing", 2), ("Cryogenics", 1)]
+ADJECTIVES = ["Benchtop", "High-speed", "Confocal", "Portable", "Refrigerated", "Digital", "Inverted", "Automated"]
+LOCATIONS = [f"Building {b}, Room {r}" for b in "ABC" for r in (101, 102, 204, 205, 310)]
+PURPOSES = [None, "Sample preparation", "Calibration", "Thesis experiment", "Course practical",
+            "Collaborator visit", "Pilot measurements", "Replication run"]
+DURATIONS_HOURS = [(0.5, 10), (1, 25), (2, 25), (3, 15), (4, 12), (8, 8), (24, 3), (72, 2)]
+PAST_STATUSES = [("approved", 60), ("cancelled", 18), ("rejected", 12), ("pending", 10)]
+FUTURE_STATUSES = [("pending", 40), ("approved", 45), ("cancelled", 10), ("rejected", 5)]
+
+USER_COLUMNS = ["id", "email", "full_name", "hashed_password", "role", "is_active", "created_at", "updated_at",
+                "lab_id"]
+EQUIPMENT_COLUMNS = ["id", "name", "category", "description", "quantity", "available_quantity", "status",
+                     "location", "created_at", "updated_at", "lab_id"]
+BOOKING_COLUMNS = ["id", "user_id", "equipment_id", "quantity", "start_time", "end_time", "purpose", "status",
+                   "admin_notes", "created_at", "updated_at", "lab_id"]
+LAB_ACCOUNT_COLUMNS = ["email", "lab_id"]
+
+
+def _weighted(rng: random.Random, options):
+    values, weights = zip(*options)
+    return rng.choices(values, weights=weights)[0]
+
+
+def _zipf_cum_weights(n: int, exponent: float):
+    return list(accumulate(1 / (rank ** exponent) for rank in range(1, n + 1)))
+
+
+def _next_id(conn: Connection, *tables) -> int:
+    """One past the highest id in any of the tables (a table and its archive share ids)."""
+    return max(conn.execute(select(func.coalesce(func.max(table.c.id), 0))).scalar() or 0 for table in tables) + 1
+
+
+def _load(conn: Connection, table, columns, rows, batch_size: int) -> int:
+    """Load rows with COPY on Postgres, multi-row INSERTs elsewhere."""
+    total = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            total += _flush(conn, table, columns, batch)
+            batch = []
+    if batch:
+        total += _flush(conn, table, columns, batch)
+    return total
+
+
+def _flush(conn: Connection, table, columns, batch) -> int:
+    if conn.dialect.name == "postgresql":
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(batch)
+        buffer.seek(0)
+        cursor = conn.connection.dbapi_connection.cursor()
+        cursor.copy_expert(f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+        cursor.close()
+    else:
+        conn.execute(table.insert(), [dict(zip(columns, row)) for row in batch])
+    return len(batch)
+
+
+def generate_users(rng: random.Random, lab_id: int, first_id: int, count: int, anchor: datetime):
+    hashed_password = get_password_hash("Password@123")
+    for user_id in range(first_id, first_id + count):
+        created = anchor - timedelta(days=rng.uniform(30, 900))
+        yield (
+            user_id,
+            f"lab{lab_id}.user{user_id}@synthetic.lab",
+            f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            hashed_password,
+            "researcher" if rng.random() < 0.15 else "student",
+            rng.random() < 0.97,
+            created,
+            created,
+            lab_id,
+        )
+
+
+def generate_equipment(rng: random.Random, lab_id: int, first_id: int, count: int, anchor: datetime):
+    for equipment_id in range(first_id, first_id + count):
+        category = _weighted(rng, CATEGORIES)
+        quantity = 1 if rng.random() < 0.7 else rng.randint(2, 10)
+        created = anchor - timedelta(days=rng.uniform(60, 1200))
+        yield (
+            equipment_id,
+            f"{rng.choice(ADJECTIVES)} {category.rstrip('s')} #{equipment_id}",
+            category,
+            None,
+            quantity,
+            quantity,
+            _weighted(rng, [("available", 90), ("maintenance", 7), ("retired", 3)]),
+            rng.choice(LOCATIONS),
+            created,
+            created,
+            lab_id,
+        )
+
+
+def generate_bookings(rng, lab_id, first_id, count, user_ids, equipment, anchor, past_days, future_days):
+    # Popularity ranks are shuffled so the busiest items are not simply the lowest ids
+    equipment = list(equipment)
+    rng.shuffle(equipment)
+    user_ids = list(user_ids)
+    rng.shuffle(user_ids)
+    equipment_weights = _zipf_cum_weights(len(equipment), 1.1)
+    user_weights = _zipf_cum_weights(len(user_ids), 0.8)
+    durations, duration_weights = zip(*DURATIONS_HOURS)
+    window_start = anchor - timedelta(days=past_days)
+    window_hours = (past_days + future_days) * 24
+
+    chunk = 10_000
+    for chunk_start in range(first_id, first_id + count, chunk):
+        n = min(chunk, first_id + count - chunk_start)
+        picks = rng.choices(equipment, cum_weights=equipment_weights, k=n)
+        users = rng.choices(user_ids, cum_weights=user_weights, k=n)
+        hours = rng.choices(durations, weights=duration_weights, k=n)
+        for offset in range(n):
+            equipment_id, capacity = picks[offset]
+            day = rng.randrange(window_hours // 24)
+            hour = min(23, max(0, int(rng.gauss(12, 3))))
+            start = window_start + timedelta(days=day, hours=hour, minutes=15 * rng.randrange(4))
+            end = start + timedelta(hours=hours[offset])
+            created = min(start, anchor) - timedelta(hours=rng.uniform(1, 24 * 30))
+            status = _weighted(rng, PAST_STATUSES if end <= anchor else FUTURE_STATUSES)
+            updated = created if status == "pending" else min(anchor, created + timedelta(hours=rng.uniform(0.1, 72)))
+            yield (
+                chunk_start + offset,
+                users[offset],
+                equipment_id,
+                1 if capacity == 1 or rng.random() < 0.8 else rng.randint(2, capacity),
+                start,
+                end,
+                rng.choice(PURPOSES),
+                status,
+                "Slot unavailable" if status == "rejected" else None,
+                created,
+                updated,
+                lab_id,
+            )
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.commands.generate_data")
+    parser.add_argument("--database-url", default=settings.SYNC_DATABASE_URL)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--equipment", type=int, default=200)
+    parser.add_argument("--bookings", type=int, default=100_000)
+    parser.add_argument("--lab-id", type=int, default=settings.DEFAULT_LAB_ID,
+                        help="Lab that owns the generated rows; it must already exist")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--anchor", type=datetime.fromisoformat, default=None,
+                        help="'Now' of the dataset (default: today 00:00 UTC)")
+    parser.add_argument("--past-days", type=int, default=365)
+    parser.add_argument("--future-days", type=int, default=90)
+    parser.add_argument("--batch-size", type=int, default=50_000)
+    parser.add_argument("--create-schema", action="store_true",
+                        help="Create tables with metadata.create_all (for SQLite files; use Alembic for Postgres)")
+    parser.add_argument("--directory-url", default=None,
+                        help="Primary database holding lab_accounts (default: SYNC_DATABASE_URL, "
+                             "or --database-url with --create-schema)")
+    args = parser.parse_args(argv)
+    directory_url = args.directory_url or (args.database_url if args.create_schema else settings.SYNC_DATABASE_URL)
+
+    rng = random.Random(args.seed)
+    anchor = args.anchor or datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    if anchor.tzinfo is None:
+        anchor = anchor.replace(tzinfo=timezone.utc)
+
+    engine = create_engine(args.database_url)
+    if args.create_schema:
+        Base.metadata.create_all(engine)
+        with engine.begin() as conn:
+            if conn.execute(select(Lab.id).where(Lab.id == args.lab_id)).first() is None:
+                conn.execute(insert(Lab).values(id=args.lab_id, name=f"Lab {args.lab_id}", slug=f"lab-{args.lab_id}"))
+
+    started = time.monotonic()
+    with engine.begin() as conn:
+        first_user = _next_id(conn, User.__table__)
+        user_rows = list(generate_users(rng, args.lab_id, first_user, args.users, anchor))
+        loaded = _load(conn, User.__table__, USER_COLUMNS, user_rows, args.batch_size)
+        print(f"users: {loaded}")
+
+        first_equipment = _next_id(conn, Equipment.__table__)
+        equipment_rows = list(generate_equipment(rng, args.lab_id, first_equipment, args.equipment, anchor))
+        loaded = _load(conn, Equipment.__table__, EQUIPMENT_COLUMNS, equipment_rows, args.batch_size)
+        print(f"equipment: {loaded}")
+
+        create_booking_partitions(
+            conn, anchor - timedelta(days=args.past_days), anchor + timedelta(days=args.future_days + 4)
+        )
+        first_booking = _next_id(conn, Booking.__table__, bookings_archive)
+        bookings = generate_bookings(
+            rng, args.lab_id, first_booking, args.bookings,
+            range(first_user, first_user + args.users),
+            [(row[0], row[4]) for row in equipment_rows],
+            anchor, args.past_days, args.future_days,
+        )
+        loaded = _load(conn, Booking.__table__, BOOKING_COLUMNS, bookings, args.batch_size)
+        print(f"bookings: {loaded}")
+
+        if conn.dialect.name == "postgresql":
+            # Explicit ids were loaded, so move the serial sequences past them
+            # (archived bookings keep their ids, so bookings must also clear those)
+            for table, max_id in (
+                ("users", "SELECT max(id) FROM users"),
+                ("equipment", "SELECT max(id) FROM equipment"),
+                ("bookings", "SELECT greatest((SELECT max(id) FROM bookings), "
+                             "(SELECT max(id) FROM bookings_archive))"),
+            ):
+                conn.execute(text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), ({max_id}))"))
+
+        # Login resolves the lab of an email through lab_accounts, which lives in
+        # the primary database even when this lab's data doesn't. Written last, so
+        # a failure here also rolls back the generated data.
+        account_rows = [(row[1], args.lab_id) for row in user_rows]
+        if directory_url == args.database_url:
+            _load(conn, LabAccount.__table__, LAB_ACCOUNT_COLUMNS, account_rows, args.batch_size)
+        else:
+            directory_engine = create_engine(directory_url)
+            with directory_engine.begin() as directory:
+                _load(directory, LabAccount.__table__, LAB_ACCOUNT_COLUMNS, account_rows, args.batch_size)
+            directory_engine.dispose()
+        print(f"lab accounts: {len(account_rows)}")
+    engine.dispose()
+    print(f"done in {time.monotonic() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Booking table and lab maintenance.
+
+    python -m app.commands.maintenance create-partitions [--months-ahead N]
+    python -m app.commands.maintenance archive-bookings [--older-than-days N]
+    python -m app.commands.maintenance create-lab --name NAME --slug SLUG \
+        --admin-email EMAIL --admin-password PASSWORD [--database-url URL]
+
+The commands run against SYNC_DATABASE_URL; the first two are safe to schedule
+from cron. create-lab registers the lab in the primary database and, with
+--database-url, in the database that will hold its data (list it under
+LAB_DATABASE_URLS as well). The lab's admin is created with it, since
+registration never grants the admin role.
+"""
+import argparse
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import create_engine, insert, select, text
+from app.config import settings
+from app.core.partitions import archive_bookings, create_lab_partitions, ensure_booking_partitions
+from app.core.security import get_password_hash
+from app.models.lab import Lab
+from app.models.lab_account import LabAccount
+from app.models.user import User
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.commands.maintenance")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    partitions = subcommands.add_parser("create-partitions", help="Create upcoming monthly booking partitions")
+    partitions.add_argument("--months-ahead", type=int, default=settings.BOOKING_PARTITION_MONTHS_AHEAD)
+    archive = subcommands.add_parser("archive-bookings", help="Move closed bookings into bookings_archive")
+    archive.add_argument("--older-than-days", type=int, default=90)
+    lab = subcommands.add_parser("create-lab", help="Register a lab and give it booking partitions")
+    lab.add_argument("--name", required=True)
+    lab.add_argument("--slug", required=True)
+    lab.add_argument("--admin-email", required=True)
+    lab.add_argument("--admin-password", required=True)
+    lab.add_argument("--admin-name", default="Lab Administrator")
+    lab.add_argument("--database-url", default=None, help="Sync URL of a dedicated database for the lab")
+    args = parser.parse_args(argv)
+
+    if args.command == "create-lab":
+        create_lab(args.name, args.slug, args.admin_email, args.admin_password, args.admin_name, args.database_url)
+        return
+
+    engine = create_engine(settings.SYNC_DATABASE_URL)
+    with engine.begin() as conn:
+        if args.command == "create-partitions":
+            created = ensure_booking_partitions(conn, args.months_ahead)
+            print(f"Created {len(created)} partition(s): {', '.join(created) or '-'}")
+        else:
+            before = datetime.now(timezone.utc) - timedelta(days=args.older_than_days)
+            moved = archive_bookings(conn, before)
+            print(f"Archived {moved} booking(s) that ended before {before.isoformat()}")
+    engine.dispose()
+
+
+def create_lab(
+    name: str, slug: str, admin_email: str, admin_password: str, admin_name: str, database_url=None
+) -> None:
+    admin = {
+        "email": admin_email,
+        "full_name": admin_name,
+        "hashed_password": get_password_hash(admin_password),
+        "role": "admin",
+    }
+    engine = create_engine(settings.SYNC_DATABASE_URL)
+    with engine.begin() as conn:
+        if conn.execute(select(Lab.id).where(Lab.slug == slug)).first() is not None:
+            raise SystemExit(f"A lab with slug '{slug}' already exists")
+        if conn.execute(select(LabAccount.email).where(LabAccount.email == admin_email)).first() is not None:
+            raise SystemExit(f"Email '{admin_email}' is already registered")
+        lab_id = conn.execute(insert(Lab).values(name=name, slug=slug).returning(Lab.id)).scalar_one()
+        conn.execute(insert(LabAccount).values(email=admin_email, lab_id=lab_id))
+        created = create_lab_partitions(conn, lab_id)
+        if not database_url:
+            conn.execute(insert(User).values(lab_id=lab_id, **admin))
+        else:
+            # Same id in the lab's own database, which must already be migrated.
+            # Runs inside the primary transaction, so a failure here also
+            # releases the slug and email claimed above.
+            lab_engine = create_engine(database_url)
+            try:
+                with lab_engine.begin() as lab_conn:
+                    lab_conn.execute(insert(Lab).values(id=lab_id, name=name, slug=slug))
+                    if lab_conn.dialect.name == "postgresql":
+                        lab_conn.execute(
+                            text("SELECT setval(pg_get_serial_sequence('labs', 'id'), (SELECT max(id) FROM labs))")
+                        )
+                    created += create_lab_partitions(lab_conn, lab_id)
+                    lab_conn.execute(insert(User).values(lab_id=lab_id, **admin))
+            finally:
+                lab_engine.dispose()
+    engine.dispose()
+    print(f"Created lab {lab_id} ({slug}) with admin {admin_email} "
+          f"and {len(created)} partition(s): {', '.join(created) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
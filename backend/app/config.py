@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Dict
 
 
 class Settings(BaseSettings):
@@ -10,6 +11,34 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 1440
     FIRST_ADMIN_EMAIL: str = "admin@lab.com"
     FIRST_ADMIN_PASSWORD: str = "Admin@123456"
+    DEFAULT_LAB_ID: int = 1
+    # Lab id -> async database URL for labs served from their own database
+    LAB_DATABASE_URLS: Dict[int, str] = {}
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 3.0
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 500  # per connection, asyncpg only; 0 behind pgbouncer
+    SHED_RETRY_AFTER_SECONDS: int = 5
+    RATE_LIMIT_BACKEND: str = "memory"  # memory, database, off
+    RATE_LIMIT_PER_MINUTE: Dict[str, int] = {"admin": 600, "researcher": 300, "student": 120}
+    RATE_LIMIT_BURST: Dict[str, int] = {"admin": 60, "researcher": 40, "student": 20}
+    CONCURRENCY_LIMITS: Dict[str, int] = {"reports": 4, "exports": 2, "listings": 16}
+    CONCURRENCY_WAIT_SECONDS: float = 0.5
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_QUALITY: int = 4
+    FACET_CACHE_TTL_SECONDS: int = 60
+    BOOKING_PARTITION_MONTHS_AHEAD: int = 12
+    BOOKING_PARTITION_BY_LAB: bool = False  # list-partition new monthly partitions by lab_id
+    CAPACITY_SCHEDULER_HORIZON_MINUTES: int = 60
+    CAPACITY_SCHEDULER_REFRESH_SECONDS: int = 60
+    EVENT_BATCH_SIZE: int = 500
+    EVENT_FLUSH_SECONDS: float = 1.0
+    EVENT_FLUSH_RETRIES: int = 5
+    EVENT_RETRY_BACKOFF_SECONDS: float = 0.5  # doubled after each failed attempt
+    FEED_TOKEN_EXPIRE_DAYS: int = 365
+    FEED_PAST_DAYS: int = 30
+    FEED_FUTURE_DAYS: int = 180
+    FEED_CACHE_TTL_SECONDS: int = 3600
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,47 @@
+from typing import Optional
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import AsyncSessionLocal, session_factory_for_lab
+from app.models.lab_account import LabAccount
+
+
+def _in_primary(lab_id: int) -> bool:
+    return session_factory_for_lab(lab_id) is AsyncSessionLocal
+
+
+async def lab_for_email(email: str) -> Optional[int]:
+    async with AsyncSessionLocal() as directory:
+        result = await directory.execute(select(LabAccount.lab_id).where(LabAccount.email == email))
+        return result.scalar_one_or_none()
+
+
+async def claim_email(db: AsyncSession, email: str, lab_id: int) -> bool:
+    """Record ``email`` as belonging to ``lab_id``; False if it is taken.
+
+    For labs in the primary database the entry joins ``db``'s transaction and
+    commits or rolls back with the user. For routed labs it is committed in the
+    primary database right away; undo it with ``release_email`` on failure.
+    """
+    if _in_primary(lab_id):
+        if (await db.execute(select(LabAccount.email).where(LabAccount.email == email))).first():
+            return False
+        db.add(LabAccount(email=email, lab_id=lab_id))
+        return True
+    async with AsyncSessionLocal() as directory:
+        directory.add(LabAccount(email=email, lab_id=lab_id))
+        try:
+            await directory.commit()
+        except IntegrityError:
+            return False
+    return True
+
+
+async def release_email(db: AsyncSession, email: str, lab_id: int) -> None:
+    """Drop the directory entry; in ``db``'s transaction when that is the primary database."""
+    if _in_primary(lab_id):
+        await db.execute(delete(LabAccount).where(LabAccount.email == email))
+        return
+    async with AsyncSessionLocal() as directory:
+        await directory.execute(delete(LabAccount).where(LabAccount.email == email))
+        await directory.commit()
@@ -0,0 +1,160 @@
+import asyncio
+import math
+import time
+from typing import AsyncIterator, Dict, Optional, Tuple
+from fastapi import HTTPException
+from sqlalchemy import case, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from starlette.background import BackgroundTask
+from starlette.responses import StreamingResponse
+from app.config import settings
+from app.models.rate_limit import RateLimitBucket
+from app.models.user import User
+
+MAX_MEMORY_BUCKETS = 10_000
+
+
+def too_many_requests(retry_after: float) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail="Rate limit exceeded",
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+def service_unavailable(detail: str, retry_after: Optional[int] = None) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail=detail,
+        headers={"Retry-After": str(retry_after or settings.SHED_RETRY_AFTER_SECONDS)},
+    )
+
+
+class RateLimiter:
+    """Token bucket per (lab, user id), refilled at the per-minute rate of the user's role.
+
+    Buckets live in process memory by default. With RATE_LIMIT_BACKEND=database
+    they are kept in ``rate_limit_buckets`` so every worker shares them, at the
+    cost of one upsert (and commit) on the request's own session per request.
+    """
+
+    def __init__(self):
+        # (tokens, updated, rate, burst): each bucket keeps its own role's limits
+        self._buckets: Dict[Tuple[int, int], Tuple[float, float, float, float]] = {}
+
+    def _limits(self, role: str) -> Tuple[float, float]:
+        per_minute = settings.RATE_LIMIT_PER_MINUTE.get(role, settings.RATE_LIMIT_PER_MINUTE["student"])
+        burst = settings.RATE_LIMIT_BURST.get(role, settings.RATE_LIMIT_BURST["student"])
+        return per_minute / 60.0, float(burst)
+
+    async def check(self, user: User, db: AsyncSession) -> None:
+        if settings.RATE_LIMIT_BACKEND == "off":
+            return
+        rate, burst = self._limits(user.role)
+        if settings.RATE_LIMIT_BACKEND == "database":
+            allowed, tokens = await self._take_shared(db, f"lab:{user.lab_id}:user:{user.id}", rate, burst)
+        else:
+            allowed, tokens = self._take((user.lab_id, user.id), rate, burst)
+        if not allowed:
+            raise too_many_requests((1 - tokens) / rate)
+
+    def _take(self, key: Tuple[int, int], rate: float, burst: float) -> Tuple[bool, float]:
+        now = time.monotonic()
+        tokens, updated, _, _ = self._buckets.get(key, (burst, now, rate, burst))
+        tokens = min(burst, tokens + (now - updated) * rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        if len(self._buckets) >= MAX_MEMORY_BUCKETS and key not in self._buckets:
+            # Buckets that have refilled completely carry no state worth keeping
+            self._buckets = {
+                k: (t, u, r, b) for k, (t, u, r, b) in self._buckets.items() if t + (now - u) * r < b
+            }
+        self._buckets[key] = (tokens, now, rate, burst)
+        return allowed, tokens
+
+    async def _take_shared(self, db: AsyncSession, key: str, rate: float, burst: float) -> Tuple[bool, float]:
+        now = func.clock_timestamp()
+        refilled = func.least(
+            burst, RateLimitBucket.tokens + func.extract("epoch", now - RateLimitBucket.updated_at) * rate
+        )
+        stmt = pg_insert(RateLimitBucket).values(key=key, tokens=burst - 1, last_allowed=True, updated_at=now)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[RateLimitBucket.key],
+            set_={
+                "tokens": case((refilled >= 1, refilled - 1), else_=refilled),
+                "last_allowed": refilled >= 1,
+                "updated_at": now,
+            },
+        ).returning(RateLimitBucket.last_allowed, RateLimitBucket.tokens)
+        # Committed at once, so the bucket row is not locked for the duration of
+        # the request. Runs on the request's session before the handler does any
+        # work, so it needs no second pooled connection.
+        allowed, tokens = (await db.execute(stmt)).one()
+        await db.commit()
+        return allowed, tokens
+
+
+class ConcurrencyLimiter:
+    """Caps in-flight requests per route class in this worker process."""
+
+    def __init__(self):
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def _semaphore(self, route_class: str) -> asyncio.Semaphore:
+        if route_class not in self._semaphores:
+            self._semaphores[route_class] = asyncio.Semaphore(settings.CONCURRENCY_LIMITS[route_class])
+        return self._semaphores[route_class]
+
+    async def acquire(self, route_class: str) -> None:
+        try:
+            await asyncio.wait_for(
+                self._semaphore(route_class).acquire(), timeout=settings.CONCURRENCY_WAIT_SECONDS
+            )
+        except asyncio.TimeoutError:
+            raise service_unavailable(f"Too many concurrent {route_class} requests, try again shortly")
+
+    def release(self, route_class: str) -> None:
+        self._semaphore(route_class).release()
+
+
+rate_limiter = RateLimiter()
+concurrency_limiter = ConcurrencyLimiter()
+
+
+class Admission:
+    """A held concurrency slot.
+
+    Streaming endpoints respond with ``streaming_response`` so the slot covers
+    the body as well, since dependencies exit before a streamed body is sent.
+    """
+
+    def __init__(self, route_class: str):
+        self.route_class = route_class
+        self._held = True
+        self._detached = False
+
+    def release(self) -> None:
+        if self._held:
+            self._held = False
+            concurrency_limiter.release(self.route_class)
+
+    def close(self) -> None:
+        if not self._detached:
+            self.release()
+
+    async def _guarded(self, body: AsyncIterator[str]) -> AsyncIterator[str]:
+        try:
+            async for chunk in body:
+                yield chunk
+        finally:
+            self.release()
+
+    def streaming_response(self, body: AsyncIterator[str], **kwargs) -> StreamingResponse:
+        # The body releases the slot when it ends, fails or is cancelled; Starlette
+        # skips background tasks after a failed body, so that alone would leak it.
+        # The background task covers a body that is never started.
+        self._detached = True
+        return StreamingResponse(self._guarded(body), background=BackgroundTask(self.release), **kwargs)
+
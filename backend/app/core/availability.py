@@ -0,0 +1,104 @@
+import heapq
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from itertools import accumulate
+from typing import Iterable, List, Optional, Tuple
+
+RECURRENCE_STEPS = {"daily": timedelta(days=1), "weekly": timedelta(weeks=1)}
+
+
+class OverlapIndex:
+    """Reserved quantity over arbitrary windows from one batch of reservations.
+
+    Reservations are (start, end, quantity) tuples. Starts and ends are kept
+    sorted with prefix sums, so the quantity overlapping a window is the sum of
+    everything that started before the window ends minus everything that ended
+    before it starts: two binary searches per window instead of a query.
+    Overlap uses the same half-open rule as ``check_conflict``.
+    """
+
+    def __init__(self, reservations: Iterable[Tuple[datetime, datetime, int]]):
+        rows = list(reservations)
+        by_start = sorted((start, qty) for start, _, qty in rows)
+        by_end = sorted((end, qty) for _, end, qty in rows)
+        self.starts = [start for start, _ in by_start]
+        self.ends = [end for end, _ in by_end]
+        self.start_totals = [0, *accumulate(qty for _, qty in by_start)]
+        self.end_totals = [0, *accumulate(qty for _, qty in by_end)]
+
+    def booked(self, start: datetime, end: datetime) -> int:
+        started = self.start_totals[bisect_left(self.starts, end)]
+        finished = self.end_totals[bisect_right(self.ends, start)]
+        return started - finished
+
+
+def expand_occurrences(
+    start_time: datetime,
+    end_time: datetime,
+    frequency: str,
+    interval: int,
+    until: datetime,
+) -> List[Tuple[datetime, datetime]]:
+    step = RECURRENCE_STEPS[frequency] * interval
+    duration = end_time - start_time
+    occurrences = []
+    start = start_time
+    while start <= until:
+        occurrences.append((start, start + duration))
+        start += step
+    return occurrences
+
+
+def _fit_working_hours(
+    start: datetime, duration: timedelta, working_hours: Tuple[int, int]
+) -> datetime:
+    opens, closes = working_hours
+    day_open = start.replace(hour=opens, minute=0, second=0, microsecond=0)
+    if start < day_open:
+        return day_open
+    day_close = day_open + timedelta(hours=closes - opens)
+    if start + duration <= day_close:
+        return start
+    return day_open + timedelta(days=1)
+
+
+def find_free_windows(
+    reserved: OverlapIndex,
+    capacity: int,
+    quantity: int,
+    duration: timedelta,
+    after: datetime,
+    before: datetime,
+    limit: int,
+    working_hours: Optional[Tuple[int, int]] = None,
+) -> List[Tuple[datetime, datetime]]:
+    """Earliest non-overlapping windows with ``quantity`` units free.
+
+    Moving a window later only frees capacity when it passes the end of a
+    reservation, so the only start times worth testing are ``after``, the
+    reservation ends, the end of each window already found and, with working
+    hours, the opening time of each day. They are swept in order from a heap.
+    """
+    candidates = [after, *(end for end in reserved.ends if after < end < before)]
+    heapq.heapify(candidates)
+    windows = []
+    earliest = after
+    while candidates and len(windows) < limit:
+        start = heapq.heappop(candidates)
+        if start < earliest:
+            continue
+        if working_hours:
+            fitted = _fit_working_hours(start, duration, working_hours)
+            if fitted != start:
+                heapq.heappush(candidates, fitted)
+                continue
+        end = start + duration
+        if end > before:
+            break
+        if reserved.booked(start, end) + quantity <= capacity:
+            windows.append((start, end))
+            earliest = end
+            heapq.heappush(candidates, end)
+        else:
+            earliest = start + timedelta(microseconds=1)
+    return windows
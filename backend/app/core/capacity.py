@@ -0,0 +1,195 @@
+import asyncio
+import heapq
+import logging
+from contextlib import suppress
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional
+from sqlalchemy import select, update, func, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.database import AsyncSessionLocal, CAPACITY_SCHEDULER_LOCK_ID, all_session_factories, session_factory_for_lab
+from app.models.booking import Booking
+from app.models.equipment import Equipment
+
+logger = logging.getLogger(__name__)
+
+
+async def sync_available_quantity(db: AsyncSession, equipment_ids: Optional[Iterable[int]] = None) -> None:
+    """Set available_quantity to quantity minus the approved bookings in progress.
+
+    Runs as one UPDATE over the given equipment, or over every row when no ids
+    are passed. It is idempotent, so applying the same transition twice is harmless.
+    """
+    now = datetime.now(timezone.utc)
+    in_use = (
+        select(func.coalesce(func.sum(Booking.quantity), 0))
+        .where(
+            Booking.equipment_id == Equipment.id,
+            Booking.status == "approved",
+            Booking.start_time <= now,
+            Booking.end_time > now,
+        )
+        .scalar_subquery()
+    )
+    stmt = (
+        update(Equipment)
+        .values(available_quantity=func.greatest(0, Equipment.quantity - in_use))
+        .execution_options(synchronize_session=False)
+    )
+    if equipment_ids is not None:
+        stmt = stmt.where(Equipment.id.in_(list(equipment_ids)))
+    await db.execute(stmt)
+
+
+class CapacityScheduler:
+    """Min-heap of upcoming approved-booking start and end times.
+
+    When transitions come due, the equipment they touch is resynchronized in one
+    batched UPDATE. The heap is refilled from the database every refresh over
+    the next horizon, so approvals made by other processes are picked up too.
+    With several workers only the holder of a Postgres advisory lock runs it;
+    the others retry every refresh and take over if the leader goes away.
+    There is one scheduler per database, since equipment ids are per database.
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal):
+        self.session_factory = session_factory
+        self.engine = session_factory.kw["bind"]
+        self.horizon = timedelta(minutes=settings.CAPACITY_SCHEDULER_HORIZON_MINUTES)
+        self.refresh = timedelta(seconds=settings.CAPACITY_SCHEDULER_REFRESH_SECONDS)
+        self._heap = []
+        self._queued = set()
+        self._loaded_until: Optional[datetime] = None
+        self._next_refresh: Optional[datetime] = None
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._leader_conn = None
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        if self._leader_conn is not None:
+            await self._leader_conn.close()
+            self._leader_conn = None
+
+    async def _acquire_leadership(self) -> bool:
+        if self.engine.dialect.name != "postgresql":
+            return True
+        if self._leader_conn is not None:
+            # The lock lives as long as the session, so a dead connection means
+            # another worker may already lead: drop it and compete again
+            try:
+                await self._leader_conn.execute(select(1))
+                await self._leader_conn.commit()
+            except Exception:
+                logger.warning("Capacity scheduler lost its leader connection")
+                with suppress(Exception):
+                    await self._leader_conn.close()
+                self._leader_conn = None
+                self._loaded_until = self._next_refresh = None
+        if self._leader_conn is None:
+            # Session-level lock, held for as long as this connection stays open
+            conn = await self.engine.connect()
+            acquired = (await conn.execute(select(func.pg_try_advisory_lock(CAPACITY_SCHEDULER_LOCK_ID)))).scalar()
+            await conn.commit()
+            if not acquired:
+                await conn.close()
+                return False
+            self._leader_conn = conn
+        return True
+
+    async def _resync(self) -> None:
+        async with self.session_factory() as db:
+            await sync_available_quantity(db)
+            await db.commit()
+
+    def schedule(self, equipment_id: int, *times: datetime) -> None:
+        """Queue transitions within the loaded horizon; later ones are loaded on refresh."""
+        if self._loaded_until is None:
+            return
+        for due in times:
+            if due <= self._loaded_until:
+                self._push(due, equipment_id)
+        self._wakeup.set()
+
+    def _push(self, due: datetime, equipment_id: int) -> None:
+        key = (due, equipment_id)
+        if key not in self._queued:
+            self._queued.add(key)
+            heapq.heappush(self._heap, key)
+
+    async def _load(self, now: datetime) -> None:
+        # Look back one refresh so transitions approved elsewhere since the
+        # last load are not missed
+        since, until = now - self.refresh, now + self.horizon
+        async with self.session_factory() as db:
+            result = await db.execute(
+                select(Booking.equipment_id, Booking.start_time, Booking.end_time).where(
+                    Booking.status == "approved",
+                    or_(
+                        and_(Booking.start_time > since, Booking.start_time <= until),
+                        and_(Booking.end_time > since, Booking.end_time <= until),
+                    ),
+                )
+            )
+        for equipment_id, start, end in result.all():
+            for due in (start, end):
+                if since < due <= until:
+                    self._push(due, equipment_id)
+        self._loaded_until = until
+        self._next_refresh = now + self.refresh
+
+    async def _apply_due(self, now: datetime) -> None:
+        due = set()
+        while self._heap and self._heap[0][0] <= now:
+            key = heapq.heappop(self._heap)
+            self._queued.discard(key)
+            due.add(key[1])
+        if due:
+            async with self.session_factory() as db:
+                await sync_available_quantity(db, due)
+                await db.commit()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                if not await self._acquire_leadership():
+                    await asyncio.sleep(self.refresh.total_seconds())
+                    continue
+                if self._loaded_until is None:
+                    await self._resync()
+            except Exception:
+                logger.exception("Capacity scheduler could not start")
+                await asyncio.sleep(self.refresh.total_seconds())
+                continue
+
+            now = datetime.now(timezone.utc)
+            try:
+                if self._next_refresh is None or now >= self._next_refresh:
+                    await self._load(now)
+                await self._apply_due(now)
+            except Exception:
+                logger.exception("Capacity scheduler tick failed")
+                self._next_refresh = now + self.refresh
+
+            wake_at = self._next_refresh
+            if self._heap and self._heap[0][0] < wake_at:
+                wake_at = self._heap[0][0]
+            self._wakeup.clear()
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(
+                    self._wakeup.wait(), timeout=max(0.0, (wake_at - datetime.now(timezone.utc)).total_seconds())
+                )
+
+
+capacity_schedulers = {factory: CapacityScheduler(factory) for factory in all_session_factories()}
+
+
+def capacity_scheduler_for_lab(lab_id: int) -> CapacityScheduler:
+    return capacity_schedulers[session_factory_for_lab(lab_id)]
@@ -1,16 +1,22 @@
 from typing import Annotated
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, bindparam
 from app.database import get_db
+from app.core.admission import Admission, concurrency_limiter, rate_limiter
 from app.core.security import decode_token
+from app.core.tenancy import LAB_HEADER, token_lab_id
 from app.models.user import User
 
 bearer_scheme = HTTPBearer()
 
+# Built once so every authenticated request reuses its cache key and compiled form
+_user_by_id = select(User).where(User.id == bindparam("user_id"), User.lab_id == bindparam("lab_id"))
+
 
 async def get_current_user(
+    request: Request,
     credentials: Annotated[HTTPAuthorizationCredentials, Depends(bearer_scheme)],
     db: Annotated[AsyncSession, Depends(get_db)],
 ) -> User:
@@ -23,13 +29,20 @@ async def get_current_user(
     if payload is None:
         raise credentials_exception
     user_id: int = payload.get("sub")
-    if user_id is None:
+    # Feed tokens travel in calendar URLs and only grant read access to .ics feeds
+    if user_id is None or payload.get("scope") == "feed":
         raise credentials_exception
 
-    result = await db.execute(select(User).where(User.id == int(user_id)))
+    # The token's lab picked the database in get_db; the user must belong to it
+    lab_id = token_lab_id(payload)
+    header = request.headers.get(LAB_HEADER)
+    if header is not None and header != str(lab_id):
+        raise HTTPException(status_code=403, detail="Token is not valid for this lab")
+    result = await db.execute(_user_by_id, {"user_id": int(user_id), "lab_id": lab_id})
     user = result.scalar_one_or_none()
     if user is None or not user.is_active:
         raise credentials_exception
+    await rate_limiter.check(user, db)
     return user
 
 
@@ -43,3 +56,17 @@ async def get_admin_or_researcher(current_user: Annotated[User, Depends(get_curr
     if current_user.role not in ("admin", "researcher"):
         raise HTTPException(status_code=403, detail="Researcher or admin access required")
     return current_user
+
+
+def admit(route_class: str):
+    """Hold a concurrency slot of ``route_class`` (see CONCURRENCY_LIMITS) for the request."""
+
+    async def dependency(_: Annotated[User, Depends(get_current_user)]):
+        await concurrency_limiter.acquire(route_class)
+        admission = Admission(route_class)
+        try:
+            yield admission
+        finally:
+            admission.close()
+
+    return dependency
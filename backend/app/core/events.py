@@ -0,0 +1,121 @@
+import asyncio
+import logging
+from contextlib import suppress
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Optional
+from sqlalchemy import insert
+from app.config import settings
+from app.database import session_factory_for_lab
+from app.models.booking_event import BookingEvent
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class EventRecorder:
+    """Write-behind queue for booking events.
+
+    Routers enqueue events after their own commit, so recording costs no round
+    trip. A background task flushes the queue in multi-row INSERTs of up to
+    EVENT_BATCH_SIZE rows, at most EVENT_FLUSH_SECONDS after the first queued
+    event, and drains whatever is left on shutdown. Events of labs served from
+    their own database are written there. A failed INSERT is retried up to
+    EVENT_FLUSH_RETRIES times with exponential backoff before the batch is
+    dropped; new events keep queueing meanwhile.
+    """
+
+    def __init__(self):
+        self.batch_size = settings.EVENT_BATCH_SIZE
+        self.flush_seconds = settings.EVENT_FLUSH_SECONDS
+        self.retries = settings.EVENT_FLUSH_RETRIES
+        self.backoff_seconds = settings.EVENT_RETRY_BACKOFF_SECONDS
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    def record(
+        self,
+        lab_id: int,
+        booking_id: int,
+        equipment_id: int,
+        from_status: Optional[str],
+        to_status: str,
+        actor_id: Optional[int],
+    ) -> None:
+        self._queue.put_nowait({
+            "lab_id": lab_id,
+            "booking_id": booking_id,
+            "equipment_id": equipment_id,
+            "from_status": from_status,
+            "to_status": to_status,
+            "actor_id": actor_id,
+            "created_at": datetime.now(timezone.utc),
+        })
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._queue.put_nowait(_STOP)
+            await self._task
+            self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            first = await self._queue.get()
+            if first is _STOP:
+                break
+            batch = [first]
+            deadline = loop.time() + self.flush_seconds
+            while len(batch) < self.batch_size:
+                try:
+                    event = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        event = await asyncio.wait_for(self._queue.get(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                if event is _STOP:
+                    stopping = True
+                    break
+                batch.append(event)
+            await self._flush(batch)
+
+        # Anything enqueued after the stop marker
+        rest = []
+        with suppress(asyncio.QueueEmpty):
+            while True:
+                event = self._queue.get_nowait()
+                if event is not _STOP:
+                    rest.append(event)
+        for start in range(0, len(rest), self.batch_size):
+            await self._flush(rest[start:start + self.batch_size])
+
+    async def _flush(self, batch) -> None:
+        by_database = defaultdict(list)
+        for event in batch:
+            by_database[session_factory_for_lab(event["lab_id"])].append(event)
+        for session_factory, events in by_database.items():
+            for attempt in range(self.retries + 1):
+                try:
+                    async with session_factory() as db:
+                        await db.execute(insert(BookingEvent).values(events))
+                        await db.commit()
+                    break
+                except Exception:
+                    if attempt == self.retries:
+                        logger.exception(
+                            "Failed to write %d booking event(s) after %d attempt(s)", len(events), attempt + 1
+                        )
+                    else:
+                        await asyncio.sleep(self.backoff_seconds * 2 ** attempt)
+
+
+event_recorder = EventRecorder()
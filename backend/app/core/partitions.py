@@ -0,0 +1,148 @@
+from datetime import datetime, timezone
+from typing import List
+from sqlalchemy import text, delete, insert, select
+from sqlalchemy.engine import Connection
+from app.config import settings
+from app.models.booking import Booking, bookings_archive
+
+ARCHIVABLE_STATUSES = ("approved", "rejected", "cancelled")
+
+
+def _month_start(value: datetime) -> datetime:
+    value = value.astimezone(timezone.utc)
+    return datetime(value.year, value.month, 1, tzinfo=timezone.utc)
+
+
+def _next_month(value: datetime) -> datetime:
+    if value.month == 12:
+        return value.replace(year=value.year + 1, month=1)
+    return value.replace(month=value.month + 1)
+
+
+def bookings_partitioned(conn: Connection) -> bool:
+    if conn.dialect.name != "postgresql":
+        return False
+    return _partitioned(conn, "bookings")
+
+
+def _partitioned(conn: Connection, table: str) -> bool:
+    return bool(
+        conn.execute(
+            text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table)"), {"table": table}
+        ).scalar()
+    )
+
+
+def _child_partitions(conn: Connection, parent: str) -> set:
+    return set(
+        conn.execute(
+            text("SELECT inhrelid::regclass::text FROM pg_inherits WHERE inhparent = to_regclass(:parent)"),
+            {"parent": parent},
+        ).scalars()
+    )
+
+
+def _attach_lab_partition(conn: Connection, month_table: str, lab_id: int) -> str:
+    # Same move-then-attach dance as for months, against the month's default
+    name = f"{month_table}_lab_{lab_id}"
+    conn.execute(text(f"CREATE TABLE {name} (LIKE {month_table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    conn.execute(
+        text(
+            f"WITH moved AS (DELETE FROM {month_table}_default WHERE lab_id = :lab_id RETURNING *) "
+            f"INSERT INTO {name} SELECT * FROM moved"
+        ),
+        {"lab_id": lab_id},
+    )
+    conn.execute(text(f"ALTER TABLE {month_table} ATTACH PARTITION {name} FOR VALUES IN ({int(lab_id)})"))
+    return name
+
+
+def create_lab_partitions(conn: Connection, lab_id: int) -> List[str]:
+    """Give a lab its own sub-partition in every month that is list-partitioned by lab."""
+    if not bookings_partitioned(conn):
+        return []
+    created = []
+    for month_table in sorted(_child_partitions(conn, "bookings")):
+        if month_table == "bookings_default" or not _partitioned(conn, month_table):
+            continue
+        if f"{month_table}_lab_{lab_id}" not in _child_partitions(conn, month_table):
+            created.append(_attach_lab_partition(conn, month_table, lab_id))
+    return created
+
+
+def create_booking_partitions(conn: Connection, start: datetime, end: datetime) -> List[str]:
+    """Create the monthly partitions covering [start, end) that don't exist yet.
+
+    Rows that already landed in the default partition for a new month are moved
+    into it before it is attached, otherwise the ATTACH would be rejected. With
+    BOOKING_PARTITION_BY_LAB each new month is itself list-partitioned by lab_id,
+    with one partition per existing lab and a default for labs added later.
+    """
+    if not bookings_partitioned(conn):
+        return []
+    existing = _child_partitions(conn, "bookings")
+    created = []
+    month = _month_start(start)
+    while month < end:
+        following = _next_month(month)
+        name = f"bookings_{month:%Y_%m}"
+        if name not in existing:
+            bounds = {"lo": month, "hi": following}
+            if settings.BOOKING_PARTITION_BY_LAB:
+                conn.execute(
+                    text(
+                        f"CREATE TABLE {name} (LIKE bookings INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+                        f"PARTITION BY LIST (lab_id)"
+                    )
+                )
+                conn.execute(text(f"CREATE TABLE {name}_default PARTITION OF {name} DEFAULT"))
+                for lab_id in conn.execute(text("SELECT id FROM labs ORDER BY id")).scalars():
+                    conn.execute(
+                        text(f"CREATE TABLE {name}_lab_{lab_id} PARTITION OF {name} FOR VALUES IN ({int(lab_id)})")
+                    )
+            else:
+                conn.execute(text(f"CREATE TABLE {name} (LIKE bookings INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+            conn.execute(
+                text(
+                    f"WITH moved AS (DELETE FROM bookings_default WHERE start_time >= :lo AND start_time < :hi "
+                    f"RETURNING *) INSERT INTO {name} SELECT * FROM moved"
+                ),
+                bounds,
+            )
+            conn.execute(
+                text(
+                    f"ALTER TABLE bookings ATTACH PARTITION {name} "
+                    f"FOR VALUES FROM ('{month.isoformat()}') TO ('{following.isoformat()}')"
+                )
+            )
+            created.append(name)
+        month = following
+    return created
+
+
+def ensure_booking_partitions(conn: Connection, months_ahead: int = None) -> List[str]:
+    """Make sure partitions exist from the current month through ``months_ahead``."""
+    months_ahead = settings.BOOKING_PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    start = _month_start(datetime.now(timezone.utc))
+    end = start
+    for _ in range(months_ahead + 1):
+        end = _next_month(end)
+    return create_booking_partitions(conn, start, end)
+
+
+def archive_bookings(conn: Connection, before: datetime) -> int:
+    """Move closed bookings that ended before ``before`` into bookings_archive."""
+    columns = [column.name for column in Booking.__table__.columns]
+    moved = (
+        delete(Booking.__table__)
+        .where(
+            Booking.status.in_(ARCHIVABLE_STATUSES),
+            Booking.end_time < before,
+        )
+        .returning(*Booking.__table__.columns)
+        .cte("moved")
+    )
+    result = conn.execute(
+        insert(bookings_archive).from_select(columns, select(*(moved.c[name] for name in columns)))
+    )
+    return result.rowcount
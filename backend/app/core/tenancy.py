@@ -0,0 +1,33 @@
+from typing import Optional
+from fastapi import Request
+from app.config import settings
+from app.core.security import decode_token
+
+LAB_HEADER = "X-Lab-Id"
+
+
+def token_lab_id(payload: dict) -> int:
+    # Tokens issued before labs existed belong to the default lab
+    return int(payload.get("lab") or settings.DEFAULT_LAB_ID)
+
+
+def request_lab_id(request: Request) -> int:
+    """The lab a request is for, resolved before any database access.
+
+    A signed token (bearer header, or the ``token`` query parameter of feed URLs)
+    decides; registration may name a lab with the X-Lab-Id header (login looks
+    the lab up by email instead). Everything else belongs to DEFAULT_LAB_ID.
+    """
+    lab_id: Optional[int] = getattr(request.state, "lab_id", None)
+    if lab_id is not None:
+        return lab_id
+    authorization = request.headers.get("authorization", "")
+    token = authorization[7:] if authorization[:7].lower() == "bearer " else request.query_params.get("token")
+    payload = decode_token(token) if token else None
+    if payload is not None:
+        lab_id = token_lab_id(payload)
+    else:
+        header = request.headers.get(LAB_HEADER, "")
+        lab_id = int(header) if header.isdigit() else settings.DEFAULT_LAB_ID
+    request.state.lab_id = lab_id
+    return lab_id
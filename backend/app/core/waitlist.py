@@ -0,0 +1,80 @@
+from datetime import datetime, timezone
+from typing import List
+from sqlalchemy import select, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.availability import OverlapIndex
+from app.models.booking import Booking
+from app.models.equipment import Equipment
+from app.models.waitlist_entry import WaitlistEntry
+
+
+async def promote_waitlist(
+    db: AsyncSession, equipment_id: int, start_time: datetime, end_time: datetime
+) -> List[Booking]:
+    """Turn waiters overlapping a freed interval into pending bookings, FIFO.
+
+    Runs inside the caller's transaction after the freeing change is flushed.
+    Waiters are examined oldest first and each one that now fits is promoted;
+    ones that still don't fit keep their place. Returns the new bookings.
+    """
+    # Serializes promotions per equipment item across workers
+    result = await db.execute(select(Equipment).where(Equipment.id == equipment_id).with_for_update())
+    eq = result.scalar_one_or_none()
+    if not eq or eq.status != "available":
+        return []
+
+    now = datetime.now(timezone.utc)
+    result2 = await db.execute(
+        select(WaitlistEntry)
+        .where(
+            WaitlistEntry.lab_id == eq.lab_id,
+            WaitlistEntry.equipment_id == equipment_id,
+            WaitlistEntry.status == "waiting",
+            WaitlistEntry.end_time > max(start_time, now),
+            WaitlistEntry.start_time < end_time,
+        )
+        .order_by(WaitlistEntry.id)
+        .with_for_update()
+    )
+    waiters = result2.scalars().all()
+    if not waiters:
+        return []
+
+    result3 = await db.execute(
+        select(Booking.start_time, Booking.end_time, Booking.quantity).where(
+            and_(
+                Booking.lab_id == eq.lab_id,
+                Booking.equipment_id == equipment_id,
+                Booking.status.in_(["pending", "approved"]),
+                Booking.start_time < max(w.end_time for w in waiters),
+                Booking.end_time > min(w.start_time for w in waiters),
+            )
+        )
+    )
+    reserved = OverlapIndex(result3.all())
+    promoted = []
+    for waiter in waiters:
+        booked = reserved.booked(waiter.start_time, waiter.end_time) + sum(
+            b.quantity for _, b in promoted if b.start_time < waiter.end_time and b.end_time > waiter.start_time
+        )
+        if booked + waiter.quantity > eq.quantity:
+            continue
+        booking = Booking(
+            lab_id=waiter.lab_id,
+            user_id=waiter.user_id,
+            equipment_id=equipment_id,
+            quantity=waiter.quantity,
+            start_time=waiter.start_time,
+            end_time=waiter.end_time,
+            purpose=waiter.purpose,
+            status="pending",
+        )
+        db.add(booking)
+        promoted.append((waiter, booking))
+
+    if promoted:
+        await db.flush()
+        for waiter, booking in promoted:
+            waiter.status = "promoted"
+            waiter.booking_id = booking.id
+    return [booking for _, booking in promoted]
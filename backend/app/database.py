@@ -1,17 +1,76 @@
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from typing import Dict, List
+from fastapi import Request
+from sqlalchemy import select, func
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncEngine, AsyncSession
 from sqlalchemy.orm import DeclarativeBase
 from app.config import settings
+from app.core.tenancy import request_lab_id
 
-engine = create_async_engine(settings.DATABASE_URL, echo=False, future=True)
+# Postgres advisory lock keys for work that must run once across all workers
+STARTUP_LOCK_ID = 7_341_001
+CAPACITY_SCHEDULER_LOCK_ID = 7_341_002
+
+
+def _create_engine(url: str) -> AsyncEngine:
+    # asyncpg keeps an LRU of prepared statements per connection, keyed by SQL text;
+    # the hot-path statements compile to stable text, so they are prepared once per
+    # pooled connection and then only bound and executed
+    connect_args = {}
+    if url.startswith("postgresql+asyncpg"):
+        connect_args["prepared_statement_cache_size"] = settings.DB_PREPARED_STATEMENT_CACHE_SIZE
+
+    # Pool limits are per worker process: N workers open up to N * (size + overflow).
+    # A checkout that waits longer than DB_POOL_TIMEOUT is shed with a 503.
+    # SQLite engines don't use a QueuePool and reject these arguments.
+    pool_args = {}
+    if make_url(url).get_backend_name() != "sqlite":
+        pool_args = {
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "pool_timeout": settings.DB_POOL_TIMEOUT,
+        }
+    return create_async_engine(
+        url,
+        echo=False,
+        future=True,
+        pool_pre_ping=True,
+        connect_args=connect_args,
+        **pool_args,
+    )
+
+
+engine = _create_engine(settings.DATABASE_URL)
 AsyncSessionLocal = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
+# Labs listed in LAB_DATABASE_URLS live in their own database; labs sharing a URL
+# share one engine. Every other lab uses the default engine above.
+_routed: Dict[str, async_sessionmaker] = {}
+lab_session_factories: Dict[int, async_sessionmaker] = {}
+for _lab_id, _url in settings.LAB_DATABASE_URLS.items():
+    if _url == settings.DATABASE_URL:
+        continue
+    if _url not in _routed:
+        _routed[_url] = async_sessionmaker(_create_engine(_url), class_=AsyncSession, expire_on_commit=False)
+    lab_session_factories[int(_lab_id)] = _routed[_url]
+
+
+def session_factory_for_lab(lab_id: int) -> async_sessionmaker:
+    return lab_session_factories.get(lab_id, AsyncSessionLocal)
+
+
+def all_session_factories() -> List[async_sessionmaker]:
+    """The default database first, then each routed database once."""
+    return [AsyncSessionLocal, *_routed.values()]
+
 
 class Base(DeclarativeBase):
     pass
 
 
-async def get_db() -> AsyncSession:
-    async with AsyncSessionLocal() as session:
+async def get_db(request: Request) -> AsyncSession:
+    # The session is bound to the database of the lab the request is for
+    async with session_factory_for_lab(request_lab_id(request))() as session:
         try:
             yield session
             await session.commit()
@@ -20,3 +79,9 @@ async def get_db() -> AsyncSession:
             raise
         finally:
             await session.close()
+
+
+async def advisory_xact_lock(db, lock_id: int) -> None:
+    """Block until no other worker holds ``lock_id``; released at commit/rollback."""
+    if db.bind.dialect.name == "postgresql":
+        await db.execute(select(func.pg_advisory_xact_lock(lock_id)))
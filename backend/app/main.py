@@ -1,32 +1,68 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from brotli_asgi import BrotliMiddleware
 from contextlib import asynccontextmanager
 from sqlalchemy import select
-from app.database import AsyncSessionLocal
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from app.database import STARTUP_LOCK_ID, advisory_xact_lock, all_session_factories, session_factory_for_lab
+from app.models.lab import Lab
 from app.models.user import User
+from app.core.accounts import claim_email
+from app.core.capacity import capacity_schedulers
+from app.core.events import event_recorder
+from app.core.partitions import ensure_booking_partitions
 from app.core.security import get_password_hash
 from app.config import settings
-from app.routers import auth, users, equipment, bookings, dashboard, reports
+from app.routers import auth, users, equipment, bookings, dashboard, reports, feeds
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Create default admin user if none exists
-    async with AsyncSessionLocal() as db:
-        result = await db.execute(select(User).where(User.role == "admin"))
+    # Startup work is serialized with an advisory lock so that N workers
+    # booting at once seed one admin and create each partition once
+    async with session_factory_for_lab(settings.DEFAULT_LAB_ID)() as db:
+        await advisory_xact_lock(db, STARTUP_LOCK_ID)
+        lab = await db.get(Lab, settings.DEFAULT_LAB_ID)
+        if not lab:
+            db.add(Lab(id=settings.DEFAULT_LAB_ID, name="Default Lab", slug="default"))
+            await db.flush()
+        result = await db.execute(
+            select(User).where(User.role == "admin", User.lab_id == settings.DEFAULT_LAB_ID).limit(1)
+        )
         admin = result.scalar_one_or_none()
         if not admin:
             admin_user = User(
+                lab_id=settings.DEFAULT_LAB_ID,
                 email=settings.FIRST_ADMIN_EMAIL,
                 full_name="System Administrator",
                 hashed_password=get_password_hash(settings.FIRST_ADMIN_PASSWORD),
                 role="admin",
             )
             db.add(admin_user)
-            await db.commit()
+            await claim_email(db, settings.FIRST_ADMIN_EMAIL, settings.DEFAULT_LAB_ID)
             print(f"Created default admin: {settings.FIRST_ADMIN_EMAIL}")
-    yield
+        await db.commit()
 
+    # Keep monthly booking partitions created ahead of time, in every database
+    for session_factory in all_session_factories():
+        async with session_factory() as db:
+            await advisory_xact_lock(db, STARTUP_LOCK_ID)
+            conn = await db.connection()
+            created = await conn.run_sync(ensure_booking_partitions)
+            if created:
+                print(f"Created booking partitions: {', '.join(created)}")
+            await db.commit()
+
+    # Track booking start/end times; only one worker at a time runs each scheduler
+    for scheduler in capacity_schedulers.values():
+        await scheduler.start()
+    await event_recorder.start()
+    yield
+    for scheduler in capacity_schedulers.values():
+        await scheduler.stop()
+    # Drain queued booking events before the worker exits
+    await event_recorder.stop()
 
 app = FastAPI(
     title="Lab Management System",
@@ -35,6 +71,14 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+# Brotli when the client accepts it, gzip otherwise; small bodies are sent as-is
+app.add_middleware(
+    BrotliMiddleware,
+    quality=settings.COMPRESSION_QUALITY,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    gzip_fallback=True,
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -43,12 +87,23 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(PoolTimeoutError)
+async def shed_on_pool_timeout(request: Request, exc: PoolTimeoutError):
+    # Fail fast instead of queueing more requests behind an exhausted pool
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Service overloaded, try again shortly"},
+        headers={"Retry-After": str(settings.SHED_RETRY_AFTER_SECONDS)},
+    )
+
+
 app.include_router(auth.router, prefix="/api/v1")
 app.include_router(users.router, prefix="/api/v1")
 app.include_router(equipment.router, prefix="/api/v1")
 app.include_router(bookings.router, prefix="/api/v1")
 app.include_router(dashboard.router, prefix="/api/v1")
 app.include_router(reports.router, prefix="/api/v1")
+app.include_router(feeds.router, prefix="/api/v1")
 
 
 @app.get("/")
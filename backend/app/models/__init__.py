@@ -1,6 +1,14 @@
 from app.database import Base
+from app.models.lab import Lab
+from app.models.lab_account import LabAccount
 from app.models.user import User
 from app.models.equipment import Equipment
 from app.models.booking import Booking
+from app.models.booking_series import BookingSeries
+from app.models.booking_event import BookingEvent
+from app.models.rate_limit import RateLimitBucket
+from app.models.waitlist_entry import WaitlistEntry
 
-__all__ = ["Base", "User", "Equipment", "Booking"]
+__all__ = [
+    "Base", "Lab", "LabAccount", "User", "Equipment", "Booking", "BookingSeries", "BookingEvent", "RateLimitBucket", "WaitlistEntry",
+]
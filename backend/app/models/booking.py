@@ -1,23 +1,53 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index, Table, select, union_all
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, aliased
 from app.database import Base
 
 
 class Booking(Base):
+    # Range-partitioned by month on start_time in Postgres (see app.core.partitions)
     __tablename__ = "bookings"
 
     id = Column(Integer, primary_key=True, index=True)
+    lab_id = Column(Integer, ForeignKey("labs.id"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     equipment_id = Column(Integer, ForeignKey("equipment.id"), nullable=False)
     quantity = Column(Integer, default=1, nullable=False)
-    start_time = Column(DateTime(timezone=True), nullable=False)
-    end_time = Column(DateTime(timezone=True), nullable=False)
+    start_time = Column(DateTime(timezone=True), nullable=False, index=True)
+    end_time = Column(DateTime(timezone=True), nullable=False, index=True)
     purpose = Column(Text, nullable=True)
     status = Column(String, default="pending", nullable=False)  # pending, approved, rejected, cancelled
     admin_notes = Column(Text, nullable=True)
+    series_id = Column(Integer, ForeignKey("booking_series.id"), nullable=True, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
 
     user = relationship("User", back_populates="bookings", lazy="select")
     equipment = relationship("Equipment", back_populates="bookings", lazy="select")
+    series = relationship("BookingSeries", back_populates="bookings", lazy="select")
+
+    __table_args__ = (
+        Index("ix_bookings_equipment_id_start_time", "equipment_id", "start_time"),
+        Index("ix_bookings_lab_id_start_time", "lab_id", "start_time"),
+        Index("ix_bookings_lab_id_created_at", "lab_id", "created_at"),
+        Index("ix_bookings_lab_id_status", "lab_id", "status"),
+        Index("ix_bookings_user_id_updated_at", "user_id", "updated_at"),
+        Index("ix_bookings_equipment_id_updated_at", "equipment_id", "updated_at"),
+    )
+
+
+# Closed bookings moved out of the live table; same columns as bookings.
+bookings_archive = Table(
+    "bookings_archive",
+    Base.metadata,
+    *(
+        Column(column.name, column.type, primary_key=column.primary_key, nullable=column.nullable)
+        for column in Booking.__table__.columns
+    ),
+)
+
+
+def booking_history():
+    """Booking entity over live and archived rows, for reports."""
+    history = union_all(select(Booking.__table__), select(bookings_archive)).subquery("booking_history")
+    return aliased(Booking, history, name="booking_history")
@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, ForeignKey, Index
+from app.database import Base
+
+
+class BookingEvent(Base):
+    """Append-only log of booking status transitions.
+
+    booking_id is not a foreign key: bookings are partitioned and archived, and
+    events outlive deleted bookings.
+    """
+
+    __tablename__ = "booking_events"
+    __table_args__ = (
+        Index("ix_booking_events_booking_id_created_at", "booking_id", "created_at"),
+        Index("ix_booking_events_lab_id_to_status_created_at", "lab_id", "to_status", "created_at"),
+    )
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    lab_id = Column(Integer, nullable=False)
+    booking_id = Column(Integer, nullable=False)
+    equipment_id = Column(Integer, nullable=False)
+    from_status = Column(String, nullable=True)  # null for creation
+    to_status = Column(String, nullable=False)  # pending, approved, rejected, cancelled, deleted
+    actor_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False)
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+from app.database import Base
+
+
+class BookingSeries(Base):
+    __tablename__ = "booking_series"
+
+    id = Column(Integer, primary_key=True, index=True)
+    lab_id = Column(Integer, ForeignKey("labs.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    equipment_id = Column(Integer, ForeignKey("equipment.id"), nullable=False)
+    quantity = Column(Integer, default=1, nullable=False)
+    frequency = Column(String, nullable=False)  # daily, weekly
+    interval = Column(Integer, default=1, nullable=False)
+    until = Column(DateTime(timezone=True), nullable=False)
+    purpose = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    bookings = relationship("Booking", back_populates="series", lazy="select")
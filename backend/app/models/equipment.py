@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -6,8 +6,13 @@ from app.database import Base
 
 class Equipment(Base):
     __tablename__ = "equipment"
+    __table_args__ = (
+        Index("ix_equipment_lab_id_name", "lab_id", "name"),
+        Index("ix_equipment_lab_id_category", "lab_id", "category"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
+    lab_id = Column(Integer, ForeignKey("labs.id"), nullable=False)
     name = Column(String, nullable=False)
     category = Column(String, nullable=False)
     description = Column(Text, nullable=True)
@@ -15,6 +20,7 @@ class Equipment(Base):
     available_quantity = Column(Integer, default=1, nullable=False)
     status = Column(String, default="available", nullable=False)  # available, maintenance, retired
     location = Column(String, nullable=True)
+    feed_version = Column(Integer, default=0, nullable=False)  # bumped when a booking leaves the feed
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
 
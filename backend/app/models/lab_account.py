@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String, ForeignKey
+from app.database import Base
+
+
+class LabAccount(Base):
+    """Email -> lab directory, authoritative in the primary database.
+
+    Keeps emails unique across labs served from separate databases and lets
+    login find an account's lab (and so its database) from the email alone.
+    """
+
+    __tablename__ = "lab_accounts"
+
+    email = Column(String, primary_key=True)
+    lab_id = Column(Integer, ForeignKey("labs.id"), nullable=False)
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, String, Float, Boolean, DateTime
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class RateLimitBucket(Base):
+    """Token bucket state shared by all workers when RATE_LIMIT_BACKEND=database."""
+
+    __tablename__ = "rate_limit_buckets"
+
+    key = Column(String, primary_key=True)
+    tokens = Column(Float, nullable=False)
+    last_allowed = Column(Boolean, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
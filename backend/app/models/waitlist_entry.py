@@ -0,0 +1,37 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index, text
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+from app.database import Base
+
+
+class WaitlistEntry(Base):
+    __tablename__ = "waitlist_entries"
+    __table_args__ = (
+        # Only waiting entries are indexed; promotion looks up the ones on an
+        # equipment item that have not ended and start before the freed interval ends
+        Index(
+            "ix_waitlist_entries_waiting",
+            "equipment_id",
+            "end_time",
+            "start_time",
+            postgresql_where=text("status = 'waiting'"),
+            sqlite_where=text("status = 'waiting'"),
+        ),
+        Index("ix_waitlist_entries_lab_id_user_id", "lab_id", "user_id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    lab_id = Column(Integer, ForeignKey("labs.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    equipment_id = Column(Integer, ForeignKey("equipment.id"), nullable=False)
+    quantity = Column(Integer, default=1, nullable=False)
+    start_time = Column(DateTime(timezone=True), nullable=False)
+    end_time = Column(DateTime(timezone=True), nullable=False)
+    purpose = Column(Text, nullable=True)
+    status = Column(String, default="waiting", nullable=False)  # waiting, promoted, cancelled
+    booking_id = Column(Integer, nullable=True)  # set on promotion
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    user = relationship("User", lazy="select")
+    equipment = relationship("Equipment", lazy="select")
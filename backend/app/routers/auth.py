@@ -1,43 +1,63 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from app.database import get_db
+from sqlalchemy.exc import IntegrityError
+from app.database import get_db, session_factory_for_lab
+from app.models.lab import Lab
 from app.models.user import User
 from app.schemas.user import UserCreate, UserResponse, Token, LoginRequest
+from app.core.accounts import claim_email, lab_for_email, release_email
 from app.core.security import verify_password, get_password_hash, create_access_token
+from app.core.tenancy import request_lab_id
 from typing import Annotated
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-async def register(user_in: UserCreate, db: Annotated[AsyncSession, Depends(get_db)]):
-    result = await db.execute(select(User).where(User.email == user_in.email))
-    if result.scalar_one_or_none():
+async def register(user_in: UserCreate, request: Request, db: Annotated[AsyncSession, Depends(get_db)]):
+    # New users join the lab named by the X-Lab-Id header, or the default lab
+    lab_id = request_lab_id(request)
+    if (await db.execute(select(Lab.id).where(Lab.id == lab_id))).scalar_one_or_none() is None:
+        raise HTTPException(status_code=400, detail="Unknown lab")
+
+    # Emails are unique across every lab, whichever database holds it
+    if not await claim_email(db, user_in.email, lab_id):
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    # Only allow admin role if no admins exist
+    # Admins are seeded at startup (default lab) or by `maintenance create-lab`,
+    # never self-registered
     role = user_in.role if user_in.role in ("researcher", "student") else "student"
-    result2 = await db.execute(select(User).where(User.role == "admin"))
-    if not result2.scalar_one_or_none() and user_in.role == "admin":
-        role = "admin"
 
     user = User(
+        lab_id=lab_id,
         email=user_in.email,
         full_name=user_in.full_name,
         hashed_password=get_password_hash(user_in.password),
         role=role,
     )
     db.add(user)
-    await db.commit()
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        await release_email(db, user_in.email, lab_id)
+        await db.commit()
+        raise HTTPException(status_code=400, detail="Email already registered")
     await db.refresh(user)
     return user
 
 
 @router.post("/login", response_model=Token)
-async def login(login_data: LoginRequest, db: Annotated[AsyncSession, Depends(get_db)]):
-    result = await db.execute(select(User).where(User.email == login_data.email))
-    user = result.scalar_one_or_none()
+async def login(login_data: LoginRequest):
+    # The directory names the account's lab, and so the database to check the
+    # password against; clients don't have to know either
+    user = None
+    lab_id = await lab_for_email(login_data.email)
+    if lab_id is not None:
+        async with session_factory_for_lab(lab_id)() as db:
+            result = await db.execute(select(User).where(User.email == login_data.email, User.lab_id == lab_id))
+            user = result.scalar_one_or_none()
     if not user or not verify_password(login_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -46,5 +66,5 @@ async def login(login_data: LoginRequest, db: Annotated[AsyncSession, Depends(ge
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
 
-    token = create_access_token({"sub": str(user.id)})
+    token = create_access_token({"sub": str(user.id), "lab": user.lab_id})
     return {"access_token": token, "token_type": "bearer", "user": user}
@@ -1,20 +1,53 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_
+from sqlalchemy import select, insert, update, func, and_, or_, bindparam
 from sqlalchemy.orm import selectinload
+from datetime import datetime, timedelta, timezone
 from typing import Annotated, List, Optional
 from app.database import get_db
 from app.models.booking import Booking
+from app.models.booking_series import BookingSeries
 from app.models.equipment import Equipment
 from app.models.user import User
-from app.schemas.booking import BookingCreate, BookingResponse, BookingUpdate
-from app.core.deps import get_current_user, get_admin_user
+from app.models.waitlist_entry import WaitlistEntry
+from app.schemas.booking import (
+    BookingCreate, BookingResponse, BookingUpdate, BookingSeriesCreate, BookingSeriesResponse,
+    CalendarEquipment, MAX_BOOKING_DAYS, WaitlistEntryResponse,
+)
+from app.core.availability import OverlapIndex, expand_occurrences
+from app.core.capacity import capacity_scheduler_for_lab, sync_available_quantity
+from app.core.deps import admit, get_current_user, get_admin_user
+from app.core.events import event_recorder
+from app.core.waitlist import promote_waitlist
 
 router = APIRouter(prefix="/bookings", tags=["bookings"])
 
+MAX_CALENDAR_DAYS = 62
+
+# Hot-path statements are built once with bound parameters: each execution
+# reuses the memoized cache key and compiled form (and, on asyncpg, the
+# connection's prepared statement) instead of rebuilding the construct
+_equipment_by_id = select(Equipment).where(
+    Equipment.id == bindparam("equipment_id"), Equipment.lab_id == bindparam("lab_id")
+)
+_booking_with_relations = (
+    select(Booking)
+    .options(selectinload(Booking.user), selectinload(Booking.equipment))
+    .where(Booking.id == bindparam("booking_id"), Booking.lab_id == bindparam("lab_id"))
+)
+_reserved_quantity = select(func.coalesce(func.sum(Booking.quantity), 0)).where(
+    Booking.lab_id == bindparam("lab_id"),
+    Booking.equipment_id == bindparam("equipment_id"),
+    Booking.status.in_(["pending", "approved"]),
+    Booking.start_time < bindparam("end_time"),
+    Booking.end_time > bindparam("start_time"),
+    Booking.id != bindparam("exclude_booking_id"),
+)
+
 
 async def check_conflict(
     db: AsyncSession,
+    lab_id: int,
     equipment_id: int,
     start_time,
     end_time,
@@ -22,30 +55,27 @@ async def check_conflict(
     exclude_booking_id: Optional[int] = None,
 ) -> bool:
     """Returns True if conflict exists (not enough availability)."""
-    result = await db.execute(select(Equipment).where(Equipment.id == equipment_id))
+    result = await db.execute(_equipment_by_id, {"equipment_id": equipment_id, "lab_id": lab_id})
     eq = result.scalar_one_or_none()
     if not eq:
         return True
 
-    # Count total approved/pending bookings that overlap
-    overlap_query = select(Booking).where(
-        and_(
-            Booking.equipment_id == equipment_id,
-            Booking.status.in_(["pending", "approved"]),
-            Booking.start_time < end_time,
-            Booking.end_time > start_time,
-        )
+    # Sum total approved/pending quantity that overlaps; ids start at 1, so 0 excludes nothing
+    result2 = await db.execute(
+        _reserved_quantity,
+        {
+            "lab_id": lab_id,
+            "equipment_id": equipment_id,
+            "start_time": start_time,
+            "end_time": end_time,
+            "exclude_booking_id": exclude_booking_id or 0,
+        },
     )
-    if exclude_booking_id:
-        overlap_query = overlap_query.where(Booking.id != exclude_booking_id)
-
-    result2 = await db.execute(overlap_query)
-    overlapping = result2.scalars().all()
-    booked_qty = sum(b.quantity for b in overlapping)
+    booked_qty = result2.scalar_one()
     return (booked_qty + quantity) > eq.quantity
 
 
-@router.get("/", response_model=List[BookingResponse])
+@router.get("/", response_model=List[BookingResponse], dependencies=[Depends(admit("listings"))])
 async def list_bookings(
     db: Annotated[AsyncSession, Depends(get_db)],
     current_user: Annotated[User, Depends(get_current_user)],
@@ -54,6 +84,7 @@ async def list_bookings(
     query = (
         select(Booking)
         .options(selectinload(Booking.user), selectinload(Booking.equipment))
+        .where(Booking.lab_id == current_user.lab_id)
         .order_by(Booking.created_at.desc())
     )
     if current_user.role == "student":
@@ -64,17 +95,154 @@ async def list_bookings(
     return result.scalars().all()
 
 
+@router.get("/calendar", response_model=List[CalendarEquipment], dependencies=[Depends(admit("listings"))])
+async def booking_calendar(
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: Annotated[User, Depends(get_current_user)],
+    start: datetime = Query(..., alias="from"),
+    end: datetime = Query(..., alias="to"),
+    category: Optional[str] = Query(None),
+):
+    """Pending and approved bookings overlapping [from, to), grouped by equipment."""
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+    if end <= start:
+        raise HTTPException(status_code=400, detail="'to' must be after 'from'")
+    if end - start > timedelta(days=MAX_CALENDAR_DAYS):
+        raise HTTPException(status_code=400, detail=f"Calendar window is limited to {MAX_CALENDAR_DAYS} days")
+
+    # Only the columns the calendar renders. No booking lasts longer than
+    # MAX_BOOKING_DAYS, so start_time is bounded on both sides: the scan of the
+    # indexed (lab_id, start_time) pair and the partitions pruned to both track
+    # the window, not the history
+    query = (
+        select(
+            Booking.id,
+            Booking.equipment_id,
+            Equipment.name,
+            Equipment.category,
+            Booking.start_time,
+            Booking.end_time,
+            Booking.quantity,
+            Booking.status,
+            Booking.user_id,
+            User.full_name,
+        )
+        .join(Equipment, Equipment.id == Booking.equipment_id)
+        .join(User, User.id == Booking.user_id)
+        .where(
+            Booking.lab_id == current_user.lab_id,
+            Booking.status.in_(["pending", "approved"]),
+            Booking.start_time > start - timedelta(days=MAX_BOOKING_DAYS),
+            Booking.start_time < end,
+            Booking.end_time > start,
+        )
+        .order_by(Booking.equipment_id, Booking.start_time)
+    )
+    if category:
+        query = query.where(Equipment.category == category)
+
+    calendar = {}
+    for row in (await db.execute(query)).all():
+        entry = calendar.get(row.equipment_id)
+        if entry is None:
+            entry = calendar[row.equipment_id] = {
+                "equipment_id": row.equipment_id,
+                "equipment_name": row.name,
+                "category": row.category,
+                "bookings": [],
+            }
+        # Students see when equipment is taken, but not by whom
+        visible = current_user.role != "student" or row.user_id == current_user.id
+        entry["bookings"].append({
+            "id": row.id,
+            "start_time": row.start_time,
+            "end_time": row.end_time,
+            "quantity": row.quantity,
+            "status": row.status,
+            "user_name": row.full_name if visible else None,
+        })
+    return list(calendar.values())
+
+
+@router.get("/waitlist", response_model=List[WaitlistEntryResponse])
+async def list_waitlist(
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: Annotated[User, Depends(get_current_user)],
+    equipment_id: Optional[int] = Query(None),
+    status: Optional[str] = Query("waiting"),
+):
+    query = select(WaitlistEntry).where(WaitlistEntry.lab_id == current_user.lab_id).order_by(WaitlistEntry.id)
+    if current_user.role == "student":
+        query = query.where(WaitlistEntry.user_id == current_user.id)
+    if equipment_id:
+        query = query.where(WaitlistEntry.equipment_id == equipment_id)
+    if status:
+        query = query.where(WaitlistEntry.status == status)
+    result = await db.execute(query)
+    return result.scalars().all()
+
+
+@router.post("/waitlist", response_model=WaitlistEntryResponse, status_code=201)
+async def join_waitlist(
+    booking_in: BookingCreate,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: Annotated[User, Depends(get_current_user)],
+):
+    """Queue a request that currently conflicts; it is booked when capacity frees up."""
+    result = await db.execute(
+        _equipment_by_id, {"equipment_id": booking_in.equipment_id, "lab_id": current_user.lab_id}
+    )
+    eq = result.scalar_one_or_none()
+    if not eq:
+        raise HTTPException(status_code=404, detail="Equipment not found")
+    if eq.status != "available":
+        raise HTTPException(status_code=400, detail="Equipment is not available")
+    if booking_in.quantity > eq.quantity:
+        raise HTTPException(status_code=400, detail="Requested quantity exceeds the equipment's total quantity")
+
+    has_conflict = await check_conflict(
+        db, current_user.lab_id, booking_in.equipment_id, booking_in.start_time, booking_in.end_time, booking_in.quantity
+    )
+    if not has_conflict:
+        raise HTTPException(status_code=400, detail="The requested slot is available; create a booking instead")
+
+    entry = WaitlistEntry(**booking_in.model_dump(), user_id=current_user.id, lab_id=current_user.lab_id)
+    db.add(entry)
+    await db.commit()
+    await db.refresh(entry)
+    return entry
+
+
+@router.delete("/waitlist/{entry_id}", status_code=204)
+async def leave_waitlist(
+    entry_id: int,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: Annotated[User, Depends(get_current_user)],
+):
+    result = await db.execute(
+        select(WaitlistEntry).where(WaitlistEntry.id == entry_id, WaitlistEntry.lab_id == current_user.lab_id)
+    )
+    entry = result.scalar_one_or_none()
+    if not entry:
+        raise HTTPException(status_code=404, detail="Waitlist entry not found")
+    if current_user.role != "admin" and entry.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    if entry.status != "waiting":
+        raise HTTPException(status_code=400, detail=f"Waitlist entry is already {entry.status}")
+    entry.status = "cancelled"
+    await db.commit()
+
+
 @router.get("/{booking_id}", response_model=BookingResponse)
 async def get_booking(
     booking_id: int,
     db: Annotated[AsyncSession, Depends(get_db)],
     current_user: Annotated[User, Depends(get_current_user)],
 ):
-    result = await db.execute(
-        select(Booking)
-        .options(selectinload(Booking.user), selectinload(Booking.equipment))
-        .where(Booking.id == booking_id)
-    )
+    result = await db.execute(_booking_with_relations, {"booking_id": booking_id, "lab_id": current_user.lab_id})
     booking = result.scalar_one_or_none()
     if not booking:
         raise HTTPException(status_code=404, detail="Booking not found")
@@ -90,7 +258,9 @@ async def create_booking(
     current_user: Annotated[User, Depends(get_current_user)],
 ):
     # Check equipment exists
-    result = await db.execute(select(Equipment).where(Equipment.id == booking_in.equipment_id))
+    result = await db.execute(
+        _equipment_by_id, {"equipment_id": booking_in.equipment_id, "lab_id": current_user.lab_id}
+    )
     eq = result.scalar_one_or_none()
     if not eq:
         raise HTTPException(status_code=404, detail="Equipment not found")
@@ -99,7 +269,7 @@ async def create_booking(
 
     # Conflict detection
     has_conflict = await check_conflict(
-        db, booking_in.equipment_id, booking_in.start_time, booking_in.end_time, booking_in.quantity
+        db, current_user.lab_id, booking_in.equipment_id, booking_in.start_time, booking_in.end_time, booking_in.quantity
     )
     if has_conflict:
         raise HTTPException(
@@ -107,18 +277,169 @@ async def create_booking(
             detail="Booking conflict: insufficient quantity available for the requested time slot",
         )
 
-    booking = Booking(**booking_in.model_dump(), user_id=current_user.id)
+    booking = Booking(**booking_in.model_dump(), user_id=current_user.id, lab_id=current_user.lab_id)
     db.add(booking)
     await db.commit()
     await db.refresh(booking)
+    event_recorder.record(booking.lab_id, booking.id, booking.equipment_id, None, booking.status, current_user.id)
 
     # Reload with relationships
+    result2 = await db.execute(_booking_with_relations, {"booking_id": booking.id, "lab_id": booking.lab_id})
+    return result2.scalar_one()
+
+
+@router.post("/series", response_model=BookingSeriesResponse, status_code=201)
+async def create_booking_series(
+    series_in: BookingSeriesCreate,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: Annotated[User, Depends(get_current_user)],
+):
+    result = await db.execute(
+        _equipment_by_id, {"equipment_id": series_in.equipment_id, "lab_id": current_user.lab_id}
+    )
+    eq = result.scalar_one_or_none()
+    if not eq:
+        raise HTTPException(status_code=404, detail="Equipment not found")
+    if eq.status != "available":
+        raise HTTPException(status_code=400, detail="Equipment is not available")
+
+    occurrences = expand_occurrences(
+        series_in.start_time, series_in.end_time, series_in.frequency, series_in.interval, series_in.until
+    )
+
+    # One fetch of every reservation overlapping the whole series, then an
+    # in-memory lookup per occurrence instead of one check_conflict per week.
     result2 = await db.execute(
-        select(Booking)
-        .options(selectinload(Booking.user), selectinload(Booking.equipment))
-        .where(Booking.id == booking.id)
+        select(Booking.start_time, Booking.end_time, Booking.quantity).where(
+            and_(
+                Booking.lab_id == eq.lab_id,
+                Booking.equipment_id == eq.id,
+                Booking.status.in_(["pending", "approved"]),
+                Booking.start_time < occurrences[-1][1],
+                Booking.end_time > occurrences[0][0],
+            )
+        )
     )
-    return result2.scalar_one()
+    reserved = OverlapIndex(result2.all())
+    accepted, conflicts = [], []
+    for start, end in occurrences:
+        if reserved.booked(start, end) + series_in.quantity > eq.quantity:
+            conflicts.append({"start_time": start, "end_time": end})
+        else:
+            accepted.append((start, end))
+    if not accepted:
+        raise HTTPException(
+            status_code=409,
+            detail="Booking conflict: insufficient quantity available for every occurrence of the series",
+        )
+
+    series = BookingSeries(
+        lab_id=current_user.lab_id,
+        user_id=current_user.id,
+        equipment_id=eq.id,
+        quantity=series_in.quantity,
+        frequency=series_in.frequency,
+        interval=series_in.interval,
+        until=series_in.until,
+        purpose=series_in.purpose,
+    )
+    db.add(series)
+    await db.flush()
+
+    result3 = await db.execute(
+        insert(Booking).returning(Booking.id),
+        [
+            {
+                "lab_id": current_user.lab_id,
+                "user_id": current_user.id,
+                "equipment_id": eq.id,
+                "quantity": series_in.quantity,
+                "start_time": start,
+                "end_time": end,
+                "purpose": series_in.purpose,
+                "status": "pending",
+                "series_id": series.id,
+            }
+            for start, end in accepted
+        ],
+    )
+    booking_ids = result3.scalars().all()
+    await db.commit()
+    for booking_id in booking_ids:
+        event_recorder.record(current_user.lab_id, booking_id, eq.id, None, "pending", current_user.id)
+
+    return {
+        "id": series.id,
+        "equipment_id": series.equipment_id,
+        "quantity": series.quantity,
+        "frequency": series.frequency,
+        "interval": series.interval,
+        "until": series.until,
+        "booking_ids": booking_ids,
+        "conflicts": conflicts,
+    }
+
+
+@router.post("/series/{series_id}/cancel")
+async def cancel_booking_series(
+    series_id: int,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: Annotated[User, Depends(get_current_user)],
+):
+    result = await db.execute(
+        select(BookingSeries).where(BookingSeries.id == series_id, BookingSeries.lab_id == current_user.lab_id)
+    )
+    series = result.scalar_one_or_none()
+    if not series:
+        raise HTTPException(status_code=404, detail="Booking series not found")
+    if current_user.role == "student" and series.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    # Occurrences that have already started are left alone, so no capacity
+    # that is currently in use changes hands. On Postgres one statement locks,
+    # cancels and reports the previous status; joining on start_time too keeps
+    # the update on the partitions the locked rows live in.
+    old = (
+        select(Booking.id, Booking.start_time, Booking.end_time, Booking.status)
+        .where(
+            Booking.lab_id == series.lab_id,
+            Booking.series_id == series_id,
+            Booking.status.in_(["pending", "approved"]),
+            Booking.start_time > func.now(),
+        )
+        .with_for_update()
+        .subquery("old")
+    )
+    cancel = (
+        update(Booking)
+        .where(Booking.lab_id == series.lab_id, Booking.series_id == series_id)
+        .values(status="cancelled")
+        .execution_options(synchronize_session=False)
+    )
+    if db.bind.dialect.name == "postgresql":
+        result2 = await db.execute(
+            cancel.where(Booking.id == old.c.id, Booking.start_time == old.c.start_time)
+            .returning(old.c.id, old.c.status, old.c.start_time, old.c.end_time)
+        )
+        cancelled = result2.all()
+    else:
+        # Elsewhere RETURNING only sees the updated row, so read the old statuses first
+        cancelled = (await db.execute(select(old.c.id, old.c.status, old.c.start_time, old.c.end_time))).all()
+        if cancelled:
+            await db.execute(cancel.where(Booking.id.in_([row.id for row in cancelled])))
+
+    # Every freed occurrence is offered to the waitlist, as a single cancel is
+    promoted = []
+    for row in sorted(cancelled, key=lambda row: row.start_time):
+        promoted += await promote_waitlist(db, series.equipment_id, row.start_time, row.end_time)
+    await db.commit()
+    for row in cancelled:
+        event_recorder.record(series.lab_id, row.id, series.equipment_id, row.status, "cancelled", current_user.id)
+    for waiter_booking in promoted:
+        event_recorder.record(
+            waiter_booking.lab_id, waiter_booking.id, waiter_booking.equipment_id, None, "pending", None
+        )
+    return {"series_id": series_id, "cancelled": len(cancelled)}
 
 
 @router.put("/{booking_id}", response_model=BookingResponse)
@@ -128,11 +449,7 @@ async def update_booking(
     db: Annotated[AsyncSession, Depends(get_db)],
     current_user: Annotated[User, Depends(get_current_user)],
 ):
-    result = await db.execute(
-        select(Booking)
-        .options(selectinload(Booking.user), selectinload(Booking.equipment))
-        .where(Booking.id == booking_id)
-    )
+    result = await db.execute(_booking_with_relations, {"booking_id": booking_id, "lab_id": current_user.lab_id})
     booking = result.scalar_one_or_none()
     if not booking:
         raise HTTPException(status_code=404, detail="Booking not found")
@@ -145,27 +462,40 @@ async def update_booking(
         if current_user.role == "student" and booking.user_id != current_user.id:
             raise HTTPException(status_code=403, detail="Not authorized")
 
+    previous_status = booking.status
     update_data = booking_in.model_dump(exclude_none=True)
     for field, value in update_data.items():
         setattr(booking, field, value)
 
-    # Update equipment available quantity
-    if booking_in.status == "approved":
-        eq_result = await db.execute(select(Equipment).where(Equipment.id == booking.equipment_id))
-        eq = eq_result.scalar_one()
-        eq.available_quantity = max(0, eq.available_quantity - booking.quantity)
-    elif booking_in.status in ("rejected", "cancelled") and booking.status == "approved":
-        eq_result = await db.execute(select(Equipment).where(Equipment.id == booking.equipment_id))
-        eq = eq_result.scalar_one()
-        eq.available_quantity = min(eq.quantity, eq.available_quantity + booking.quantity)
+    # available_quantity counts approved bookings in progress; future ones are
+    # applied by the capacity scheduler when they start and end
+    if previous_status != booking.status and "approved" in (previous_status, booking.status):
+        await db.flush()
+        await sync_available_quantity(db, [booking.equipment_id])
+
+    # A rejected or cancelled reservation frees its slot for the waitlist
+    promoted = []
+    if previous_status in ("pending", "approved") and booking.status in ("rejected", "cancelled"):
+        await db.flush()
+        promoted = await promote_waitlist(db, booking.equipment_id, booking.start_time, booking.end_time)
 
     await db.commit()
     await db.refresh(booking)
+    if booking.status != previous_status:
+        event_recorder.record(
+            booking.lab_id, booking.id, booking.equipment_id, previous_status, booking.status, current_user.id
+        )
+    for waiter_booking in promoted:
+        event_recorder.record(
+            waiter_booking.lab_id, waiter_booking.id, waiter_booking.equipment_id, None, "pending", None
+        )
+    if booking.status == "approved":
+        capacity_scheduler_for_lab(booking.lab_id).schedule(booking.equipment_id, booking.start_time, booking.end_time)
 
     result2 = await db.execute(
-        select(Booking)
-        .options(selectinload(Booking.user), selectinload(Booking.equipment))
-        .where(Booking.id == booking.id)
+        _booking_with_relations,
+        {"booking_id": booking.id, "lab_id": booking.lab_id},
+        execution_options={"populate_existing": True},
     )
     return result2.scalar_one()
 
@@ -176,11 +506,32 @@ async def delete_booking(
     db: Annotated[AsyncSession, Depends(get_db)],
     current_user: Annotated[User, Depends(get_current_user)],
 ):
-    result = await db.execute(select(Booking).where(Booking.id == booking_id))
+    result = await db.execute(
+        select(Booking).where(Booking.id == booking_id, Booking.lab_id == current_user.lab_id)
+    )
     booking = result.scalar_one_or_none()
     if not booking:
         raise HTTPException(status_code=404, detail="Booking not found")
     if current_user.role == "student" and booking.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized")
     await db.delete(booking)
+    # Feed freshness stamps only see bookings that still exist
+    await db.execute(
+        update(User).where(User.id == booking.user_id).values(feed_version=User.feed_version + 1)
+    )
+    await db.execute(
+        update(Equipment).where(Equipment.id == booking.equipment_id).values(feed_version=Equipment.feed_version + 1)
+    )
+    if booking.status == "approved":
+        await db.flush()
+        await sync_available_quantity(db, [booking.equipment_id])
+    promoted = []
+    if booking.status in ("pending", "approved"):
+        await db.flush()
+        promoted = await promote_waitlist(db, booking.equipment_id, booking.start_time, booking.end_time)
     await db.commit()
+    event_recorder.record(booking.lab_id, booking.id, booking.equipment_id, booking.status, "deleted", current_user.id)
+    for waiter_booking in promoted:
+        event_recorder.record(
+            waiter_booking.lab_id, waiter_booking.id, waiter_booking.equipment_id, None, "pending", None
+        )
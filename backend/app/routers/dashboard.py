@@ -5,7 +5,7 @@ from typing import Annotated
 from app.database import get_db
 from app.models.user import User
 from app.models.equipment import Equipment
-from app.models.booking import Booking
+from app.models.booking import Booking, booking_history
 from app.core.deps import get_current_user
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard"])
@@ -16,18 +16,23 @@ async def get_stats(
     db: Annotated[AsyncSession, Depends(get_db)],
     current_user: Annotated[User, Depends(get_current_user)],
 ):
-    total_equipment = (await db.execute(select(func.count(Equipment.id)))).scalar()
-    total_users = (await db.execute(select(func.count(User.id)))).scalar()
-    pending_bookings = (
-        await db.execute(select(func.count(Booking.id)).where(Booking.status == "pending"))
-    ).scalar()
-    approved_bookings = (
-        await db.execute(select(func.count(Booking.id)).where(Booking.status == "approved"))
+    lab_equipment = select(func.count(Equipment.id)).where(Equipment.lab_id == current_user.lab_id)
+    # Closed bookings may have been archived, so totals count live and archived rows
+    history = booking_history()
+    lab_bookings = select(func.count(history.id)).where(history.lab_id == current_user.lab_id)
+    total_equipment = (await db.execute(lab_equipment)).scalar()
+    total_users = (
+        await db.execute(select(func.count(User.id)).where(User.lab_id == current_user.lab_id))
     ).scalar()
-    total_bookings = (await db.execute(select(func.count(Booking.id)))).scalar()
-    available_equipment = (
-        await db.execute(select(func.count(Equipment.id)).where(Equipment.status == "available"))
+    # Pending bookings are never archived
+    pending_bookings = (
+        await db.execute(
+            select(func.count(Booking.id)).where(Booking.lab_id == current_user.lab_id, Booking.status == "pending")
+        )
     ).scalar()
+    approved_bookings = (await db.execute(lab_bookings.where(history.status == "approved"))).scalar()
+    total_bookings = (await db.execute(lab_bookings)).scalar()
+    available_equipment = (await db.execute(lab_equipment.where(Equipment.status == "available"))).scalar()
 
     return {
         "total_equipment": total_equipment,
@@ -42,10 +47,13 @@ async def get_stats(
 @router.get("/bookings-by-status")
 async def bookings_by_status(
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[User, Depends(get_current_user)],
 ):
+    history = booking_history()
     result = await db.execute(
-        select(Booking.status, func.count(Booking.id)).group_by(Booking.status)
+        select(history.status, func.count(history.id))
+        .where(history.lab_id == current_user.lab_id)
+        .group_by(history.status)
     )
     return [{"status": row[0], "count": row[1]} for row in result.all()]
 
@@ -53,13 +61,15 @@ async def bookings_by_status(
 @router.get("/bookings-by-month")
 async def bookings_by_month(
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[User, Depends(get_current_user)],
 ):
+    history = booking_history()
     result = await db.execute(
         select(
-            func.date_trunc("month", Booking.created_at).label("month"),
-            func.count(Booking.id).label("count"),
+            func.date_trunc("month", history.created_at).label("month"),
+            func.count(history.id).label("count"),
         )
+        .where(history.lab_id == current_user.lab_id)
         .group_by("month")
         .order_by("month")
     )
@@ -72,13 +82,15 @@ async def bookings_by_month(
 @router.get("/equipment-usage")
 async def equipment_usage(
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[User, Depends(get_current_user)],
 ):
+    history = booking_history()
     result = await db.execute(
-        select(Equipment.name, func.count(Booking.id).label("bookings"))
-        .join(Booking, Booking.equipment_id == Equipment.id, isouter=True)
+        select(Equipment.name, func.count(history.id).label("bookings"))
+        .join(history, history.equipment_id == Equipment.id, isouter=True)
+        .where(Equipment.lab_id == current_user.lab_id)
         .group_by(Equipment.id, Equipment.name)
-        .order_by(func.count(Booking.id).desc())
+        .order_by(func.count(history.id).desc())
         .limit(10)
     )
     return [{"name": row[0], "bookings": row[1]} for row in result.all()]
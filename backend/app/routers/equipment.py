@@ -1,40 +1,230 @@
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, func, and_, true
 from typing import Annotated, List, Optional
 from app.database import get_db
+from app.models.booking import Booking
 from app.models.equipment import Equipment
 from app.models.user import User
-from app.schemas.equipment import EquipmentCreate, EquipmentResponse, EquipmentUpdate
-from app.core.deps import get_current_user, get_admin_user
+from app.schemas.equipment import EquipmentCreate, EquipmentResponse, EquipmentUpdate, EquipmentSlot
+from app.config import settings
+from app.core.availability import OverlapIndex, find_free_windows
+from app.core.cache import TTLCache
+from app.core.deps import admit, get_current_user, get_admin_user
 
 router = APIRouter(prefix="/equipment", tags=["equipment"])
 
+MAX_SLOT_SEARCH_DAYS = 366
+FACETS = ("category", "status", "location")
 
-@router.get("/", response_model=List[EquipmentResponse])
+# Cleared by create/update/delete_equipment
+facet_cache = TTLCache(settings.FACET_CACHE_TTL_SECONDS)
+
+
+class SlotSearch:
+    """Query parameters shared by the next-slot endpoints."""
+
+    def __init__(
+        self,
+        duration: int = Query(..., gt=0, description="Slot length in minutes"),
+        quantity: int = Query(1, gt=0),
+        after: Optional[datetime] = Query(None),
+        before: Optional[datetime] = Query(None),
+        work_start: Optional[int] = Query(None, ge=0, le=23, description="Opening hour, in the time zone of `after`"),
+        work_end: Optional[int] = Query(None, ge=1, le=24, description="Closing hour, in the time zone of `after`"),
+        limit: int = Query(5, gt=0, le=50),
+    ):
+        self.duration = timedelta(minutes=duration)
+        self.quantity = quantity
+        self.after = after or datetime.now(timezone.utc)
+        if self.after.tzinfo is None:
+            self.after = self.after.replace(tzinfo=timezone.utc)
+        self.before = before or self.after + timedelta(days=30)
+        if self.before.tzinfo is None:
+            self.before = self.before.replace(tzinfo=timezone.utc)
+        if self.before <= self.after:
+            raise HTTPException(status_code=400, detail="before must be later than after")
+        if self.before - self.after > timedelta(days=MAX_SLOT_SEARCH_DAYS):
+            raise HTTPException(status_code=400, detail=f"Search window is limited to {MAX_SLOT_SEARCH_DAYS} days")
+        self.working_hours = None
+        if work_start is not None or work_end is not None:
+            self.working_hours = (work_start or 0, work_end or 24)
+            if timedelta(hours=self.working_hours[1] - self.working_hours[0]) < self.duration:
+                raise HTTPException(status_code=400, detail="duration does not fit within working hours")
+        self.limit = limit
+
+    def windows(self, reservations, capacity: int):
+        reserved = OverlapIndex(
+            (start.astimezone(self.after.tzinfo), end.astimezone(self.after.tzinfo), qty)
+            for start, end, qty in reservations
+        )
+        return find_free_windows(
+            reserved, capacity, self.quantity, self.duration,
+            self.after, self.before, self.limit, self.working_hours,
+        )
+
+
+async def fetch_reservations(
+    db: AsyncSession, lab_id: int, equipment_ids: List[int], after: datetime, before: datetime
+):
+    result = await db.execute(
+        select(Booking.equipment_id, Booking.start_time, Booking.end_time, Booking.quantity).where(
+            and_(
+                Booking.lab_id == lab_id,
+                Booking.equipment_id.in_(equipment_ids),
+                Booking.status.in_(["pending", "approved"]),
+                Booking.start_time < before,
+                Booking.end_time > after,
+            )
+        )
+    )
+    reservations = defaultdict(list)
+    for equipment_id, start, end, qty in result.all():
+        reservations[equipment_id].append((start, end, qty))
+    return reservations
+
+
+@router.get("/", response_model=List[EquipmentResponse], dependencies=[Depends(admit("listings"))])
 async def list_equipment(
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[User, Depends(get_current_user)],
     category: Optional[str] = Query(None),
     status: Optional[str] = Query(None),
+    location: Optional[str] = Query(None),
 ):
-    query = select(Equipment)
+    query = select(Equipment).where(Equipment.lab_id == current_user.lab_id)
     if category:
         query = query.where(Equipment.category == category)
     if status:
         query = query.where(Equipment.status == status)
+    if location:
+        query = query.where(Equipment.location == location)
     query = query.order_by(Equipment.name)
     result = await db.execute(query)
     return result.scalars().all()
 
 
+@router.get("/facets")
+async def equipment_facets(
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: Annotated[User, Depends(get_current_user)],
+    category: Optional[str] = Query(None),
+    status: Optional[str] = Query(None),
+    location: Optional[str] = Query(None),
+):
+    """Counts per category, status and location under the current filters.
+
+    Each facet is counted with the filters on the other two facets only, so the
+    alternatives to a selected value keep their counts. All three come from one
+    GROUPING SETS query.
+    """
+    filters = {"category": category, "status": status, "location": location}
+    cache_key = (current_user.lab_id, *filters.values())
+    cached = facet_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    conditions = {
+        name: getattr(Equipment, name) == value if value else true() for name, value in filters.items()
+    }
+    counts = [
+        func.count().filter(*(conditions[other] for other in FACETS if other != name)).label(f"{name}_count")
+        for name in FACETS
+    ]
+    result = await db.execute(
+        select(
+            Equipment.category,
+            Equipment.status,
+            Equipment.location,
+            func.grouping(Equipment.category, Equipment.status, Equipment.location).label("grouping_id"),
+            *counts,
+        )
+        .where(Equipment.lab_id == current_user.lab_id)
+        .group_by(func.grouping_sets(Equipment.category, Equipment.status, Equipment.location))
+    )
+
+    # grouping() sets a bit for every column not grouped in the row's set
+    grouped_by = {0b011: "category", 0b101: "status", 0b110: "location"}
+    facets = {name: [] for name in FACETS}
+    for row in result.all():
+        name = grouped_by[row.grouping_id]
+        count = getattr(row, f"{name}_count")
+        if count:
+            facets[name].append({"value": getattr(row, name), "count": count})
+    for values in facets.values():
+        values.sort(key=lambda item: (-item["count"], item["value"] or ""))
+
+    facet_cache.set(cache_key, facets)
+    return facets
+
+
+@router.get("/next-slot", response_model=List[EquipmentSlot])
+async def next_slot_in_category(
+    category: str,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: Annotated[User, Depends(get_current_user)],
+    search: Annotated[SlotSearch, Depends()],
+):
+    result = await db.execute(
+        select(Equipment).where(
+            Equipment.lab_id == current_user.lab_id,
+            Equipment.category == category,
+            Equipment.status == "available",
+            Equipment.quantity >= search.quantity,
+        )
+    )
+    equipment = result.scalars().all()
+    if not equipment:
+        return []
+
+    reservations = await fetch_reservations(
+        db, current_user.lab_id, [eq.id for eq in equipment], search.after, search.before
+    )
+    slots = [
+        {"equipment_id": eq.id, "equipment_name": eq.name, "start_time": start, "end_time": end}
+        for eq in equipment
+        for start, end in search.windows(reservations[eq.id], eq.quantity)
+    ]
+    slots.sort(key=lambda slot: (slot["start_time"], slot["equipment_id"]))
+    return slots[: search.limit]
+
+
+@router.get("/{equipment_id}/next-slot", response_model=List[EquipmentSlot])
+async def next_slot(
+    equipment_id: int,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: Annotated[User, Depends(get_current_user)],
+    search: Annotated[SlotSearch, Depends()],
+):
+    result = await db.execute(
+        select(Equipment).where(Equipment.id == equipment_id, Equipment.lab_id == current_user.lab_id)
+    )
+    eq = result.scalar_one_or_none()
+    if not eq:
+        raise HTTPException(status_code=404, detail="Equipment not found")
+    if eq.status != "available":
+        raise HTTPException(status_code=400, detail="Equipment is not available")
+    if search.quantity > eq.quantity:
+        raise HTTPException(status_code=400, detail="Requested quantity exceeds equipment quantity")
+
+    reservations = await fetch_reservations(db, eq.lab_id, [eq.id], search.after, search.before)
+    return [
+        {"equipment_id": eq.id, "equipment_name": eq.name, "start_time": start, "end_time": end}
+        for start, end in search.windows(reservations[eq.id], eq.quantity)
+    ]
+
+
 @router.get("/{equipment_id}", response_model=EquipmentResponse)
 async def get_equipment(
     equipment_id: int,
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[User, Depends(get_current_user)],
 ):
-    result = await db.execute(select(Equipment).where(Equipment.id == equipment_id))
+    result = await db.execute(
+        select(Equipment).where(Equipment.id == equipment_id, Equipment.lab_id == current_user.lab_id)
+    )
     eq = result.scalar_one_or_none()
     if not eq:
         raise HTTPException(status_code=404, detail="Equipment not found")
@@ -45,11 +235,12 @@ async def get_equipment(
 async def create_equipment(
     eq_in: EquipmentCreate,
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(get_admin_user)],
+    admin: Annotated[User, Depends(get_admin_user)],
 ):
-    eq = Equipment(**eq_in.model_dump(), available_quantity=eq_in.quantity)
+    eq = Equipment(**eq_in.model_dump(), available_quantity=eq_in.quantity, lab_id=admin.lab_id)
     db.add(eq)
     await db.commit()
+    facet_cache.clear()
     await db.refresh(eq)
     return eq
 
@@ -59,9 +250,11 @@ async def update_equipment(
     equipment_id: int,
     eq_in: EquipmentUpdate,
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(get_admin_user)],
+    admin: Annotated[User, Depends(get_admin_user)],
 ):
-    result = await db.execute(select(Equipment).where(Equipment.id == equipment_id))
+    result = await db.execute(
+        select(Equipment).where(Equipment.id == equipment_id, Equipment.lab_id == admin.lab_id)
+    )
     eq = result.scalar_one_or_none()
     if not eq:
         raise HTTPException(status_code=404, detail="Equipment not found")
@@ -73,6 +266,7 @@ async def update_equipment(
     for field, value in update_data.items():
         setattr(eq, field, value)
     await db.commit()
+    facet_cache.clear()
     await db.refresh(eq)
     return eq
 
@@ -81,11 +275,14 @@ async def update_equipment(
 async def delete_equipment(
     equipment_id: int,
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(get_admin_user)],
+    admin: Annotated[User, Depends(get_admin_user)],
 ):
-    result = await db.execute(select(Equipment).where(Equipment.id == equipment_id))
+    result = await db.execute(
+        select(Equipment).where(Equipment.id == equipment_id, Equipment.lab_id == admin.lab_id)
+    )
     eq = result.scalar_one_or_none()
     if not eq:
         raise HTTPException(status_code=404, detail="Equipment not found")
     await db.delete(eq)
     await db.commit()
+    facet_cache.clear()
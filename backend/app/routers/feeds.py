@@ -0,0 +1,221 @@
+import hashlib
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func
+from typing import Annotated, Optional
+from app.config import settings
+from app.database import get_db
+from app.models.booking import Booking
+from app.models.equipment import Equipment
+from app.models.user import User
+from app.core.cache import TTLCache
+from app.core.deps import get_current_user
+from app.core.ical import render_calendar, render_event
+from app.core.security import create_access_token, decode_token
+from app.core.tenancy import token_lab_id
+
+router = APIRouter(prefix="/feeds", tags=["feeds"])
+
+ICAL_STATUS = {"approved": "CONFIRMED", "pending": "TENTATIVE"}
+
+# Keyed by feed, viewer detail level, window day and freshness stamp, so a
+# changed booking simply misses; the TTL bounds staleness of equipment/user names
+feed_cache = TTLCache(settings.FEED_CACHE_TTL_SECONDS)
+
+
+def _feed_window():
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    return today - timedelta(days=settings.FEED_PAST_DAYS), today + timedelta(days=settings.FEED_FUTURE_DAYS)
+
+
+def _not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*"
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            return last_modified.replace(microsecond=0) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+async def _serve_feed(request: Request, db: AsyncSession, token: str, kind: str, target_id: int) -> Response:
+    payload = decode_token(token)
+    if payload is None or payload.get("scope") != "feed" or payload.get("sub") is None:
+        raise HTTPException(status_code=401, detail="Invalid feed token")
+    viewer_id = int(payload["sub"])
+    lab_id = token_lab_id(payload)
+    column = Booking.user_id if kind == "user" else Booking.equipment_id
+    target_model = User if kind == "user" else Equipment
+    window_start, window_end = _feed_window()
+
+    # One round trip: the viewer's standing and token version, the target's
+    # feed version (None if it doesn't exist) and the newest change among the
+    # bookings in the window. Status changes move updated_at; deleted bookings
+    # bump the target's feed_version instead.
+    stamp = (
+        await db.execute(
+            select(
+                func.max(Booking.updated_at),
+                select(User.role)
+                .where(User.id == viewer_id, User.lab_id == lab_id, User.is_active.is_(True))
+                .scalar_subquery(),
+                select(User.feed_token_version).where(User.id == viewer_id).scalar_subquery(),
+                select(target_model.feed_version)
+                .where(target_model.id == target_id, target_model.lab_id == lab_id)
+                .scalar_subquery(),
+            ).where(
+                column == target_id,
+                Booking.lab_id == lab_id,
+                Booking.start_time < window_end,
+                Booking.end_time > window_start,
+            )
+        )
+    ).one()
+    last_modified, viewer_role, token_version, feed_version = stamp
+    # Rotating the feed token bumps the version and revokes every older token
+    if viewer_role is None or payload.get("fv", 0) != token_version:
+        raise HTTPException(status_code=401, detail="Invalid feed token")
+    if feed_version is None:
+        raise HTTPException(status_code=404, detail="Feed not found")
+    if kind == "user" and viewer_id != target_id and viewer_role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
+    if last_modified is not None and last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+
+    detailed = viewer_role != "student"
+    key = (lab_id, kind, target_id, detailed, viewer_id if kind == "equipment" and not detailed else None,
+           window_start.date(), last_modified, feed_version)
+    etag = '"' + hashlib.sha1(repr(key).encode()).hexdigest() + '"'
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=0, must-revalidate"}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+    if _not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+
+    body = feed_cache.get(key)
+    if body is None:
+        body = await _render_feed(db, lab_id, kind, target_id, viewer_id, detailed, window_start, window_end)
+        feed_cache.set(key, body)
+    return Response(content=body, media_type="text/calendar; charset=utf-8", headers=headers)
+
+
+async def _render_feed(
+    db: AsyncSession,
+    lab_id: int,
+    kind: str,
+    target_id: int,
+    viewer_id: int,
+    detailed: bool,
+    window_start: datetime,
+    window_end: datetime,
+) -> str:
+    column = Booking.user_id if kind == "user" else Booking.equipment_id
+    rows = (
+        await db.execute(
+            select(
+                Booking.id,
+                Booking.user_id,
+                Booking.start_time,
+                Booking.end_time,
+                Booking.quantity,
+                Booking.status,
+                Booking.purpose,
+                Booking.updated_at,
+                Equipment.name.label("equipment"),
+                User.full_name.label("user"),
+            )
+            .join(Equipment, Equipment.id == Booking.equipment_id)
+            .join(User, User.id == Booking.user_id)
+            .where(
+                column == target_id,
+                Booking.lab_id == lab_id,
+                Booking.status.in_(list(ICAL_STATUS)),
+                Booking.start_time < window_end,
+                Booking.end_time > window_start,
+            )
+            .order_by(Booking.start_time)
+        )
+    ).all()
+
+    events = []
+    for row in rows:
+        summary = row.equipment if row.quantity == 1 else f"{row.equipment} x{row.quantity}"
+        description = row.purpose
+        if kind == "equipment":
+            # Students see when equipment is taken, but not by whom
+            visible = detailed or row.user_id == viewer_id
+            summary = f"{summary} - {row.user}" if visible else f"{summary} (booked)"
+            description = row.purpose if visible else None
+        events.append(render_event(
+            uid=f"booking-{row.id}@lab-management-system",
+            start=row.start_time,
+            end=row.end_time,
+            stamp=row.updated_at,
+            summary=summary,
+            status=ICAL_STATUS[row.status],
+            description=description,
+        ))
+
+    if kind == "user":
+        name = (await db.execute(select(User.full_name).where(User.id == target_id))).scalar_one()
+        calendar_name = f"Lab bookings - {name}"
+    else:
+        name = (await db.execute(select(Equipment.name).where(Equipment.id == target_id))).scalar_one()
+        calendar_name = f"Lab equipment - {name}"
+    return render_calendar(calendar_name, events)
+
+
+def _feed_token_response(request: Request, user: User) -> dict:
+    token = create_access_token(
+        {"sub": str(user.id), "lab": user.lab_id, "scope": "feed", "fv": user.feed_token_version},
+        timedelta(days=settings.FEED_TOKEN_EXPIRE_DAYS),
+    )
+    user_feed = request.url_for("user_feed", user_id=user.id).include_query_params(token=token)
+    return {
+        "token": token,
+        "user_feed": str(user_feed),
+        "equipment_feed": str(request.url_for("equipment_feed", equipment_id="{equipment_id}"))
+        + f"?token={token}",
+    }
+
+
+@router.get("/token")
+async def get_feed_token(request: Request, current_user: Annotated[User, Depends(get_current_user)]):
+    return _feed_token_response(request, current_user)
+
+
+@router.post("/token/rotate")
+async def rotate_feed_token(
+    request: Request,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: Annotated[User, Depends(get_current_user)],
+):
+    """Revoke every feed token issued so far and return a new one."""
+    current_user.feed_token_version += 1
+    await db.commit()
+    return _feed_token_response(request, current_user)
+
+
+@router.get("/users/{user_id}.ics", name="user_feed")
+async def user_feed(
+    user_id: int,
+    request: Request,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    token: str = Query(...),
+):
+    return await _serve_feed(request, db, token, "user", user_id)
+
+
+@router.get("/equipment/{equipment_id}.ics", name="equipment_feed")
+async def equipment_feed(
+    equipment_id: int,
+    request: Request,
+    db: Annotated[AsyncSession, Depends(get_db)],
+    token: str = Query(...),
+):
+    return await _serve_feed(request, db, token, "equipment", equipment_id)
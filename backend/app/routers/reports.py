@@ -1,109 +1,337 @@
 import csv
 import io
-from datetime import datetime
-from fastapi import APIRouter, Depends, Query
-from fastapi.responses import StreamingResponse
+import json
+import math
+from datetime import datetime, timedelta, timezone
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
-from typing import Annotated, Optional
-from app.database import get_db
-from app.models.booking import Booking
+from sqlalchemy import select, func, cast, true, and_, Integer
+from sqlalchemy.orm import aliased
+from typing import Annotated, AsyncIterator, List, Literal, Optional
+from app.database import get_db, session_factory_for_lab
+from app.models.booking import booking_history
+from app.models.booking_event import BookingEvent
+from app.models.equipment import Equipment
 from app.models.user import User
-from app.core.deps import get_current_user, get_admin_or_researcher
+from app.core.admission import Admission
+from app.core.deps import admit, get_current_user, get_admin_or_researcher
 
 router = APIRouter(prefix="/reports", tags=["reports"])
 
+BUCKET_SECONDS = {"hour": 3600, "day": 86400, "week": 604800}
+MAX_UTILIZATION_BUCKETS = 1000
+LATENCY_PERCENTILES = (0.5, 0.9, 0.99)
+
+
+REPORT_STREAM_BATCH = 1000
+CSV_FIELDS = {
+    "ID": "id",
+    "User": "user",
+    "Email": "user_email",
+    "Equipment": "equipment",
+    "Category": "category",
+    "Quantity": "quantity",
+    "Start Time": "start_time",
+    "End Time": "end_time",
+    "Status": "status",
+    "Purpose": "purpose",
+    "Created At": "created_at",
+}
+
+
+def _report_query(
+    lab_id: int, start_date: Optional[datetime], end_date: Optional[datetime], status: Optional[str]
+):
+    history = booking_history()
+    query = (
+        select(
+            history.id,
+            User.full_name.label("user"),
+            User.email.label("user_email"),
+            Equipment.name.label("equipment"),
+            Equipment.category,
+            history.quantity,
+            history.start_time,
+            history.end_time,
+            history.status,
+            history.purpose,
+            history.created_at,
+        )
+        .select_from(history)
+        .outerjoin(User, User.id == history.user_id)
+        .outerjoin(Equipment, Equipment.id == history.equipment_id)
+        .where(history.lab_id == lab_id)
+        .order_by(history.created_at.desc())
+    )
+    if start_date:
+        query = query.where(history.created_at >= start_date)
+    if end_date:
+        query = query.where(history.created_at <= end_date)
+    if status:
+        query = query.where(history.status == status)
+    return query
+
+
+def _report_record(row) -> dict:
+    return {
+        "id": row.id,
+        "user": row.user or "",
+        "user_email": row.user_email or "",
+        "equipment": row.equipment or "",
+        "category": row.category or "",
+        "quantity": row.quantity,
+        "start_time": row.start_time.isoformat() if row.start_time else "",
+        "end_time": row.end_time.isoformat() if row.end_time else "",
+        "status": row.status,
+        "purpose": row.purpose or "",
+        "created_at": row.created_at.isoformat() if row.created_at else "",
+    }
+
+
+async def _stream_report(lab_id: int, query, render_batch) -> AsyncIterator[str]:
+    # The request's session is closed before a streamed body is sent, so the
+    # server-side cursor gets a session of its own on the lab's database
+    async with session_factory_for_lab(lab_id)() as db:
+        result = await db.stream(query.execution_options(yield_per=REPORT_STREAM_BATCH))
+        async for rows in result.partitions():
+            yield render_batch([_report_record(row) for row in rows])
+
+
+def _ndjson_batch(records: List[dict]) -> str:
+    return "".join(json.dumps(record) + "\n" for record in records)
+
+
+def _csv_batch(records: List[dict]) -> str:
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerows([record[key] for key in CSV_FIELDS.values()] for record in records)
+    return output.getvalue()
+
+
+async def _csv_stream(lab_id: int, query) -> AsyncIterator[str]:
+    output = io.StringIO()
+    csv.writer(output).writerow(CSV_FIELDS)
+    yield output.getvalue()
+    async for chunk in _stream_report(lab_id, query, _csv_batch):
+        yield chunk
+
 
 @router.get("/bookings")
 async def booking_report(
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(get_admin_or_researcher)],
+    current_user: Annotated[User, Depends(get_admin_or_researcher)],
+    admission: Annotated[Admission, Depends(admit("reports"))],
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
     status: Optional[str] = Query(None),
+    format: Literal["json", "ndjson"] = Query("json"),
 ):
-    query = (
-        select(Booking)
-        .options(selectinload(Booking.user), selectinload(Booking.equipment))
-        .order_by(Booking.created_at.desc())
-    )
-    if start_date:
-        query = query.where(Booking.created_at >= start_date)
-    if end_date:
-        query = query.where(Booking.created_at <= end_date)
-    if status:
-        query = query.where(Booking.status == status)
+    query = _report_query(current_user.lab_id, start_date, end_date, status)
+    if format == "ndjson":
+        return admission.streaming_response(
+            _stream_report(current_user.lab_id, query, _ndjson_batch),
+            media_type="application/x-ndjson",
+        )
 
     result = await db.execute(query)
-    bookings = result.scalars().all()
-
-    return [
-        {
-            "id": b.id,
-            "user": b.user.full_name if b.user else "",
-            "user_email": b.user.email if b.user else "",
-            "equipment": b.equipment.name if b.equipment else "",
-            "category": b.equipment.category if b.equipment else "",
-            "quantity": b.quantity,
-            "start_time": b.start_time.isoformat() if b.start_time else "",
-            "end_time": b.end_time.isoformat() if b.end_time else "",
-            "status": b.status,
-            "purpose": b.purpose or "",
-            "created_at": b.created_at.isoformat() if b.created_at else "",
-        }
-        for b in bookings
-    ]
+    return [_report_record(row) for row in result.all()]
 
 
 @router.get("/bookings/export/csv")
 async def export_bookings_csv(
-    db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(get_admin_or_researcher)],
+    current_user: Annotated[User, Depends(get_admin_or_researcher)],
+    admission: Annotated[Admission, Depends(admit("exports"))],
     start_date: Optional[datetime] = Query(None),
     end_date: Optional[datetime] = Query(None),
     status: Optional[str] = Query(None),
 ):
-    query = (
-        select(Booking)
-        .options(selectinload(Booking.user), selectinload(Booking.equipment))
-        .order_by(Booking.created_at.desc())
+    return admission.streaming_response(
+        _csv_stream(current_user.lab_id, _report_query(current_user.lab_id, start_date, end_date, status)),
+        media_type="text/csv",
+        headers={"Content-Disposition": f"attachment; filename=bookings_report.csv"},
     )
-    if start_date:
-        query = query.where(Booking.created_at >= start_date)
-    if end_date:
-        query = query.where(Booking.created_at <= end_date)
-    if status:
-        query = query.where(Booking.status == status)
 
-    result = await db.execute(query)
-    bookings = result.scalars().all()
 
-    output = io.StringIO()
-    writer = csv.DictWriter(
-        output,
-        fieldnames=["ID", "User", "Email", "Equipment", "Category", "Quantity",
-                    "Start Time", "End Time", "Status", "Purpose", "Created At"],
+def _bucket_origin(start: datetime, bucket: str) -> datetime:
+    origin = start.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    if bucket != "hour":
+        origin = origin.replace(hour=0)
+    if bucket == "week":
+        origin -= timedelta(days=origin.weekday())
+    return origin
+
+
+@router.get("/utilization", dependencies=[Depends(admit("reports"))])
+async def utilization_report(
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: Annotated[User, Depends(get_admin_or_researcher)],
+    start_date: Optional[datetime] = Query(None),
+    end_date: Optional[datetime] = Query(None),
+    bucket: Literal["hour", "day", "week"] = Query("day"),
+    group_by: Literal["equipment", "category"] = Query("category"),
+    category: Optional[str] = Query(None),
+):
+    """Reserved vs available capacity-hours of approved bookings, bucketed in UTC."""
+    end_date = end_date or datetime.now(timezone.utc)
+    start_date = start_date or end_date - timedelta(days=30)
+    if start_date.tzinfo is None:
+        start_date = start_date.replace(tzinfo=timezone.utc)
+    if end_date.tzinfo is None:
+        end_date = end_date.replace(tzinfo=timezone.utc)
+    if end_date <= start_date:
+        raise HTTPException(status_code=400, detail="end_date must be after start_date")
+
+    step = BUCKET_SECONDS[bucket]
+    origin = _bucket_origin(start_date, bucket).timestamp()
+    window_start, window_end = start_date.timestamp(), end_date.timestamp()
+    n_buckets = math.ceil((window_end - origin) / step)
+    if n_buckets > MAX_UTILIZATION_BUCKETS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_UTILIZATION_BUCKETS} buckets per report; use a larger bucket or a shorter window",
+        )
+
+    eq_query = select(Equipment.id, Equipment.name, Equipment.category, Equipment.quantity).where(
+        Equipment.lab_id == current_user.lab_id, Equipment.status != "retired"
+    )
+    if category:
+        eq_query = eq_query.where(Equipment.category == category)
+    groups = {}
+    for eq_id, name, eq_category, quantity in (await db.execute(eq_query)).all():
+        key, label = (eq_id, name) if group_by == "equipment" else (eq_category, eq_category)
+        group = groups.setdefault(key, {"key": key, "name": label, "capacity": 0, "reserved": [0.0] * n_buckets})
+        group["capacity"] += quantity
+
+    history = booking_history()
+    # Each booking is clipped to the window and expanded only into the buckets
+    # it touches (a lateral generate_series over bucket indexes), so the
+    # aggregation stays in Postgres and scales with bookings, not buckets.
+    lo = func.greatest(func.extract("epoch", history.start_time), window_start)
+    hi = func.least(func.extract("epoch", history.end_time), window_end)
+    buckets = func.generate_series(
+        cast(func.floor((lo - origin) / step), Integer),
+        cast(func.ceil((hi - origin) / step), Integer) - 1,
+    ).table_valued("k").lateral("buckets")
+    bucket_lo = origin + buckets.c.k * step
+    seconds = func.least(hi, bucket_lo + step) - func.greatest(lo, bucket_lo)
+    key_col = Equipment.id if group_by == "equipment" else Equipment.category
+    reserved_query = (
+        select(key_col, buckets.c.k, func.sum(history.quantity * seconds))
+        .select_from(history)
+        .join(Equipment, Equipment.id == history.equipment_id)
+        .join(buckets, true())
+        .where(
+            history.lab_id == current_user.lab_id,
+            history.status == "approved",
+            history.start_time < end_date,
+            history.end_time > start_date,
+            Equipment.status != "retired",
+        )
+        .group_by(key_col, buckets.c.k)
     )
-    writer.writeheader()
-    for b in bookings:
-        writer.writerow({
-            "ID": b.id,
-            "User": b.user.full_name if b.user else "",
-            "Email": b.user.email if b.user else "",
-            "Equipment": b.equipment.name if b.equipment else "",
-            "Category": b.equipment.category if b.equipment else "",
-            "Quantity": b.quantity,
-            "Start Time": b.start_time.isoformat() if b.start_time else "",
-            "End Time": b.end_time.isoformat() if b.end_time else "",
-            "Status": b.status,
-            "Purpose": b.purpose or "",
-            "Created At": b.created_at.isoformat() if b.created_at else "",
+    if category:
+        reserved_query = reserved_query.where(Equipment.category == category)
+    for key, k, reserved_seconds in (await db.execute(reserved_query)).all():
+        if key in groups and 0 <= k < n_buckets:
+            groups[key]["reserved"][k] += float(reserved_seconds) / 3600
+
+    bucket_hours = [
+        (min(window_end, origin + (k + 1) * step) - max(window_start, origin + k * step)) / 3600
+        for k in range(n_buckets)
+    ]
+    window_hours = sum(bucket_hours)
+    rows = []
+    for group in groups.values():
+        capacity_hours = group["capacity"] * window_hours
+        reserved_hours = sum(group["reserved"])
+        rows.append({
+            "key": group["key"],
+            "name": group["name"],
+            "capacity": group["capacity"],
+            "capacity_hours": round(capacity_hours, 3),
+            "reserved_hours": round(reserved_hours, 3),
+            "utilization": round(reserved_hours / capacity_hours, 4) if capacity_hours else 0.0,
+            "reserved_hours_by_bucket": [round(hours, 3) for hours in group["reserved"]],
         })
+    rows.sort(key=lambda row: row["utilization"], reverse=True)
 
-    output.seek(0)
-    return StreamingResponse(
-        iter([output.getvalue()]),
-        media_type="text/csv",
-        headers={"Content-Disposition": f"attachment; filename=bookings_report.csv"},
+    return {
+        "bucket": bucket,
+        "group_by": group_by,
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "buckets": [
+            {
+                "start": datetime.fromtimestamp(origin + k * step, timezone.utc).isoformat(),
+                "hours": round(hours, 3),
+            }
+            for k, hours in enumerate(bucket_hours)
+        ],
+        "groups": rows,
+    }
+
+
+@router.get("/approval-latency", dependencies=[Depends(admit("reports"))])
+async def approval_latency_report(
+    db: Annotated[AsyncSession, Depends(get_db)],
+    current_user: Annotated[User, Depends(get_admin_or_researcher)],
+    start_date: Optional[datetime] = Query(None),
+    end_date: Optional[datetime] = Query(None),
+    equipment_id: Optional[int] = Query(None),
+    category: Optional[str] = Query(None),
+):
+    """Time from creation to the first decision on a pending booking, from the event log."""
+    end_date = end_date or datetime.now(timezone.utc)
+    start_date = start_date or end_date - timedelta(days=30)
+    if start_date.tzinfo is None:
+        start_date = start_date.replace(tzinfo=timezone.utc)
+    if end_date.tzinfo is None:
+        end_date = end_date.replace(tzinfo=timezone.utc)
+    if end_date <= start_date:
+        raise HTTPException(status_code=400, detail="end_date must be after start_date")
+
+    created = aliased(BookingEvent)
+    decided = aliased(BookingEvent)
+    latency = func.extract("epoch", decided.created_at - created.created_at)
+    query = (
+        select(
+            decided.to_status,
+            func.count(),
+            func.avg(latency),
+            func.max(latency),
+            *(func.percentile_cont(p).within_group(latency) for p in LATENCY_PERCENTILES),
+        )
+        .select_from(decided)
+        .join(created, and_(created.booking_id == decided.booking_id, created.from_status.is_(None)))
+        .where(
+            decided.lab_id == current_user.lab_id,
+            decided.from_status == "pending",
+            decided.to_status.in_(["approved", "rejected"]),
+            decided.created_at >= start_date,
+            decided.created_at < end_date,
+        )
+        .group_by(decided.to_status)
     )
+    if equipment_id:
+        query = query.where(decided.equipment_id == equipment_id)
+    if category:
+        query = query.join(Equipment, Equipment.id == decided.equipment_id).where(Equipment.category == category)
+
+    outcomes = []
+    for outcome, count, mean, longest, *percentiles in (await db.execute(query)).all():
+        row = {
+            "outcome": outcome,
+            "count": count,
+            "mean_seconds": round(float(mean), 3),
+            "max_seconds": round(float(longest), 3),
+        }
+        for p, value in zip(LATENCY_PERCENTILES, percentiles):
+            row[f"p{round(p * 100)}_seconds"] = round(float(value), 3)
+        outcomes.append(row)
+    outcomes.sort(key=lambda row: row["outcome"])
+
+    return {
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "outcomes": outcomes,
+    }
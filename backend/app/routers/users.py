@@ -1,11 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from typing import Annotated, List
+from sqlalchemy import select, func, and_, or_
+from typing import Annotated, List, Optional
 from app.database import get_db
+from app.models.booking import booking_history
 from app.models.user import User
-from app.schemas.user import UserResponse, UserUpdate
-from app.core.deps import get_current_user, get_admin_user
+from app.core.accounts import release_email
+from app.schemas.user import UserDirectoryPage, UserResponse, UserUpdate
+from app.core.deps import admit, get_current_user, get_admin_user
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -15,15 +17,77 @@ async def get_me(current_user: Annotated[User, Depends(get_current_user)]):
     return current_user
 
 
-@router.get("/", response_model=List[UserResponse])
+@router.get("/", response_model=List[UserResponse], dependencies=[Depends(admit("listings"))])
 async def list_users(
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(get_admin_user)],
+    admin: Annotated[User, Depends(get_admin_user)],
 ):
-    result = await db.execute(select(User).order_by(User.created_at.desc()))
+    result = await db.execute(select(User).where(User.lab_id == admin.lab_id).order_by(User.created_at.desc()))
     return result.scalars().all()
 
 
+@router.get("/directory", response_model=UserDirectoryPage, dependencies=[Depends(admit("listings"))])
+async def user_directory(
+    db: Annotated[AsyncSession, Depends(get_db)],
+    admin: Annotated[User, Depends(get_admin_user)],
+    q: Optional[str] = Query(None, description="Search email or name"),
+    role: Optional[str] = Query(None),
+    is_active: Optional[bool] = Query(None),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(25, ge=1, le=100),
+):
+    filters = [User.lab_id == admin.lab_id]
+    if q:
+        # LIKE wildcards in the search text match literally
+        term = q.strip().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        pattern = f"%{term}%"
+        filters.append(
+            or_(User.email.ilike(pattern, escape="\\"), User.full_name.ilike(pattern, escape="\\"))
+        )
+    if role:
+        filters.append(User.role == role)
+    if is_active is not None:
+        filters.append(User.is_active == is_active)
+
+    total = (await db.execute(select(func.count()).select_from(User).where(*filters))).scalar_one()
+
+    # Pick the page first, then aggregate bookings (live and archived) for just
+    # those users in one join
+    page_users = (
+        select(User.id)
+        .where(*filters)
+        .order_by(User.created_at.desc(), User.id.desc())
+        .limit(page_size)
+        .offset((page - 1) * page_size)
+        .subquery()
+    )
+    history = booking_history()
+    result = await db.execute(
+        select(
+            User,
+            func.count(history.id),
+            func.count(history.id).filter(history.status == "pending"),
+            func.count(history.id).filter(history.status == "approved"),
+            func.max(history.created_at),
+        )
+        .join(page_users, page_users.c.id == User.id)
+        .outerjoin(history, and_(history.user_id == User.id, history.lab_id == admin.lab_id))
+        .group_by(User.id)
+        .order_by(User.created_at.desc(), User.id.desc())
+    )
+    items = [
+        {
+            **UserResponse.model_validate(user).model_dump(),
+            "total_bookings": total_bookings,
+            "pending_bookings": pending,
+            "approved_bookings": approved,
+            "last_booking_at": last_booking_at,
+        }
+        for user, total_bookings, pending, approved, last_booking_at in result.all()
+    ]
+    return {"items": items, "total": total, "page": page, "page_size": page_size}
+
+
 @router.put("/{user_id}", response_model=UserResponse)
 async def update_user(
     user_id: int,
@@ -33,7 +97,7 @@ async def update_user(
 ):
     if current_user.role != "admin" and current_user.id != user_id:
         raise HTTPException(status_code=403, detail="Not authorized")
-    result = await db.execute(select(User).where(User.id == user_id))
+    result = await db.execute(select(User).where(User.id == user_id, User.lab_id == current_user.lab_id))
     user = result.scalar_one_or_none()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -48,11 +112,12 @@ async def update_user(
 async def delete_user(
     user_id: int,
     db: Annotated[AsyncSession, Depends(get_db)],
-    _: Annotated[User, Depends(get_admin_user)],
+    admin: Annotated[User, Depends(get_admin_user)],
 ):
-    result = await db.execute(select(User).where(User.id == user_id))
+    result = await db.execute(select(User).where(User.id == user_id, User.lab_id == admin.lab_id))
     user = result.scalar_one_or_none()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     await db.delete(user)
+    await release_email(db, user.email, user.lab_id)
     await db.commit()
@@ -1,3 +1,8 @@
-from app.schemas.user import UserCreate, UserResponse, UserUpdate, Token, LoginRequest
-from app.schemas.equipment import EquipmentCreate, EquipmentResponse, EquipmentUpdate
-from app.schemas.booking import BookingCreate, BookingResponse, BookingUpdate
+from app.schemas.user import (
+    UserCreate, UserResponse, UserUpdate, UserDirectoryEntry, UserDirectoryPage, Token, LoginRequest,
+)
+from app.schemas.equipment import EquipmentCreate, EquipmentResponse, EquipmentUpdate, EquipmentSlot
+from app.schemas.booking import (
+    BookingCreate, BookingResponse, BookingUpdate, BookingSeriesCreate, BookingSeriesResponse,
+    CalendarBooking, CalendarEquipment, WaitlistEntryResponse,
+)
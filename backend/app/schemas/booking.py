@@ -1,6 +1,7 @@
-from pydantic import BaseModel, model_validator
-from datetime import datetime
-from typing import Optional
+from pydantic import BaseModel, field_validator, model_validator
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+from app.core.availability import RECURRENCE_STEPS
 from app.schemas.user import UserResponse
 from app.schemas.equipment import EquipmentResponse
 
@@ -13,24 +14,107 @@ class BookingBase(BaseModel):
     purpose: Optional[str] = None
 
 
+# Longest single booking; range queries use it as the lower bound on start_time
+MAX_BOOKING_DAYS = 31
+
+
 class BookingCreate(BookingBase):
     @model_validator(mode="after")
     def check_times(self):
         if self.end_time <= self.start_time:
             raise ValueError("end_time must be after start_time")
+        if self.end_time - self.start_time > timedelta(days=MAX_BOOKING_DAYS):
+            raise ValueError(f"a booking may last at most {MAX_BOOKING_DAYS} days")
         return self
 
 
+MAX_SERIES_OCCURRENCES = 366
+
+
+class BookingSeriesCreate(BookingBase):
+    frequency: str = "weekly"  # daily, weekly
+    interval: int = 1
+    until: datetime
+
+    @field_validator("start_time", "end_time", "until")
+    @classmethod
+    def assume_utc(cls, value: datetime) -> datetime:
+        # Occurrences are compared with stored timestamptz values
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+    @model_validator(mode="after")
+    def check_recurrence(self):
+        if self.end_time <= self.start_time:
+            raise ValueError("end_time must be after start_time")
+        if self.end_time - self.start_time > timedelta(days=MAX_BOOKING_DAYS):
+            raise ValueError(f"a booking may last at most {MAX_BOOKING_DAYS} days")
+        if self.frequency not in RECURRENCE_STEPS:
+            raise ValueError("frequency must be one of: " + ", ".join(RECURRENCE_STEPS))
+        if self.interval < 1:
+            raise ValueError("interval must be at least 1")
+        if self.until < self.start_time:
+            raise ValueError("until must not be before start_time")
+        step = RECURRENCE_STEPS[self.frequency] * self.interval
+        if self.end_time - self.start_time > step:
+            raise ValueError("occurrences of a series must not overlap each other")
+        if (self.until - self.start_time) // step + 1 > MAX_SERIES_OCCURRENCES:
+            raise ValueError(f"a series may have at most {MAX_SERIES_OCCURRENCES} occurrences")
+        return self
+
+
+class SeriesOccurrence(BaseModel):
+    start_time: datetime
+    end_time: datetime
+
+
+class BookingSeriesResponse(BaseModel):
+    id: int
+    equipment_id: int
+    quantity: int
+    frequency: str
+    interval: int
+    until: datetime
+    booking_ids: List[int]
+    conflicts: List[SeriesOccurrence]
+
+
 class BookingUpdate(BaseModel):
     status: Optional[str] = None
     admin_notes: Optional[str] = None
 
 
+class CalendarBooking(BaseModel):
+    id: int
+    start_time: datetime
+    end_time: datetime
+    quantity: int
+    status: str
+    user_name: Optional[str] = None
+
+
+class CalendarEquipment(BaseModel):
+    equipment_id: int
+    equipment_name: str
+    category: str
+    bookings: List[CalendarBooking]
+
+
+class WaitlistEntryResponse(BookingBase):
+    id: int
+    user_id: int
+    status: str
+    booking_id: Optional[int] = None
+    created_at: datetime
+
+    model_config = {"from_attributes": True}
+
+
 class BookingResponse(BookingBase):
     id: int
     user_id: int
     status: str
     admin_notes: Optional[str] = None
+    series_id: Optional[int] = None
     created_at: datetime
     updated_at: datetime
     user: Optional[UserResponse] = None
@@ -32,3 +32,10 @@ class EquipmentResponse(EquipmentBase):
     updated_at: datetime
 
     model_config = {"from_attributes": True}
+
+
+class EquipmentSlot(BaseModel):
+    equipment_id: int
+    equipment_name: str
+    start_time: datetime
+    end_time: datetime
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 
 class UserBase(BaseModel):
@@ -21,6 +21,7 @@ class UserUpdate(BaseModel):
 
 class UserResponse(UserBase):
     id: int
+    lab_id: int
     is_active: bool
     created_at: datetime
     updated_at: datetime
@@ -28,6 +29,20 @@ class UserResponse(UserBase):
     model_config = {"from_attributes": True}
 
 
+class UserDirectoryEntry(UserResponse):
+    total_bookings: int
+    pending_bookings: int
+    approved_bookings: int
+    last_booking_at: Optional[datetime] = None
+
+
+class UserDirectoryPage(BaseModel):
+    items: List[UserDirectoryEntry]
+    total: int
+    page: int
+    page_size: int
+
+
 class Token(BaseModel):
     access_token: str
     token_type: str
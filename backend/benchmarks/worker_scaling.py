@@ -0,0 +1,98 @@
+"""Requests/sec of the production server mode as the worker count grows.
+
+    python benchmarks/worker_scaling.py --workers 1 2 4 8 --path /health
+
+Starts uvicorn the way start.sh does in production (uvloop + httptools) for
+each worker count, drives it with concurrent keep-alive clients for a fixed
+duration and prints one line per run. Needs the same environment as the app
+(DATABASE_URL etc.) because the lifespan runs on every worker. Pass
+--token to benchmark an authenticated endpoint such as /api/v1/equipment/.
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+async def wait_until_ready(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(url)).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"server at {url} did not become ready")
+
+
+async def drive(url: str, concurrency: int, duration: float, headers: dict) -> tuple:
+    done = errors = 0
+    stop_at = time.monotonic() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(limits=limits, headers=headers) as client:
+        async def client_loop():
+            nonlocal done, errors
+            while time.monotonic() < stop_at:
+                try:
+                    response = await client.get(url)
+                    if response.status_code >= 400:
+                        errors += 1
+                    done += 1
+                except httpx.TransportError:
+                    errors += 1
+
+        started = time.monotonic()
+        await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+        elapsed = time.monotonic() - started
+    return done / elapsed, errors
+
+
+def run(workers: int, args) -> tuple:
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--host", "127.0.0.1", "--port", str(args.port),
+            "--workers", str(workers), "--loop", "uvloop", "--http", "httptools",
+            "--no-access-log", "--log-level", "warning",
+        ],
+        cwd=BACKEND_DIR,
+    )
+    base = f"http://127.0.0.1:{args.port}"
+    headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+    try:
+        asyncio.run(wait_until_ready(base + "/health"))
+        asyncio.run(drive(base + args.path, args.concurrency, 2.0, headers))  # warm-up
+        return asyncio.run(drive(base + args.path, args.concurrency, args.duration, headers))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--path", default="/health")
+    parser.add_argument("--token", default=None)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPUs, {args.concurrency} concurrent clients, GET {args.path}")
+    baseline = None
+    for workers in args.workers:
+        rps, errors = run(workers, args)
+        baseline = baseline or rps
+        print(f"workers={workers:<3} {rps:9.0f} req/s  x{rps / baseline:4.2f}  errors={errors}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,5 +4,16 @@ set -e
 echo "Running Alembic migrations..."
 alembic upgrade head
 
-echo "Starting FastAPI server..."
-uvicorn app.main:app --host 0.0.0.0 --port 8000 --reload
+# exec so uvicorn receives SIGTERM directly and drains in-flight requests
+if [ "${APP_ENV:-development}" = "production" ]; then
+    echo "Starting FastAPI server (production, ${WEB_CONCURRENCY:-4} workers)..."
+    exec uvicorn app.main:app --host 0.0.0.0 --port 8000 \
+        --workers "${WEB_CONCURRENCY:-4}" \
+        --loop uvloop \
+        --http httptools \
+        --timeout-graceful-shutdown "${GRACEFUL_SHUTDOWN_TIMEOUT:-30}" \
+        --proxy-headers
+else
+    echo "Starting FastAPI server (development)..."
+    exec uvicorn app.main:app --host 0.0.0.0 --port 8000 --reload
+fi